@@ -0,0 +1,213 @@
+"""
+Reviews a whole cohort of repositories from the command line.
+
+Repository URLs are read from a CSV file (a `repo_url`/`repoUrl`/`url` column, or the first
+column) or a JSONL file (objects with one of those keys). Reviews run in a process pool and
+every finished review is appended to the output JSONL file right away, so a crashed or
+interrupted run resumes where it stopped: repositories already reviewed successfully are
+skipped, failed ones are retried.
+
+Usage (from the backend directory):
+    python batch_review.py cohort.csv --output reviews.jsonl --processes 4 --llm-concurrency 8
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+from uuid import uuid4
+
+import constants
+
+URL_KEYS = ("repo_url", "repoUrl", "url")
+
+
+def read_repo_urls(path: str) -> List[str]:
+    """
+    Reads repository URLs from a CSV or JSONL file, dropping blanks and duplicates.
+
+    Args:
+        path (str): Path to a .csv or .jsonl file.
+
+    Returns:
+        List[str]: Repository URLs in file order.
+    """
+    urls = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    urls.append(next((record[key] for key in URL_KEYS if record.get(key)), ""))
+        else:
+            rows = list(csv.reader(f))
+            header = [cell.strip() for cell in rows[0]] if rows else []
+            column = next((header.index(key) for key in URL_KEYS if key in header), None)
+            if column is None:
+                column = 0
+            else:
+                rows = rows[1:]
+            urls = [row[column] for row in rows if len(row) > column]
+    return list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+
+
+def read_checkpoint(path: str) -> dict:
+    """
+    Returns the last record written for each repository in an existing output file.
+    A partially written last line (from a crash) and lines that are not review records
+    are ignored.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or "repo_url" not in record or "status" not in record:
+                continue
+            records[record["repo_url"]] = record
+    return records
+
+
+def init_worker(llm_semaphore, processes: int, stage_timeout: float) -> None:
+    from llm_hedging import hedger
+    from llm_scheduler import scheduler
+    # Keep stdout for the summary: the pipeline logs with print().
+    sys.stdout = sys.stderr
+    # Hedges only cut tail latency, which a batch does not need: do not spend tokens on them.
+    hedger.enabled = False
+    # Nobody is waiting on an HTTP response: give large repositories time to finish
+    # instead of marking their files as not analyzed.
+    constants.SUMMARY_STAGE_TIMEOUT_SECONDS = stage_timeout
+    constants.ANALYSIS_STAGE_TIMEOUT_SECONDS = stage_timeout
+    # The account limits are shared by all the processes of the pool.
+    scheduler.set_limits(max(1, constants.OPENAI_RPM_LIMIT // processes),
+                         max(1, constants.OPENAI_TPM_LIMIT // processes))
+    scheduler.limit_concurrency(llm_semaphore)
+
+
+def review_repo(repo_url: str) -> dict:
+    """
+    Runs the ProjectReviewer pipeline on one repository.
+
+    Returns:
+        dict: The JSONL record: the review, per-file summary and feedback, timing and token
+        usage, or the error if the review failed.
+    """
+    from model_service import token_usage
+    from project_reviewer import ProjectReviewer
+
+    session_id = f"batch-{uuid4()}"
+    token_usage.track(session_id)
+    reviewer = ProjectReviewer(repo_url, session_id)
+    record = {"repo_url": repo_url}
+    start = time.perf_counter()
+    try:
+        # Each repository of a cohort is reviewed once: no need to coalesce with review().
+        state = reviewer.analyze_commit()
+        record.update({
+            "status": "ok",
+            "commit_sha": reviewer.commit_sha,
+            "review": state["feedback"],
+            "files": [
+                {"path": file["path"], "summary": file["summary"], "feedback": file.get("feedback")}
+                for file in state["file_data"]
+            ],
+        })
+    except Exception as e:
+        record.update({"status": "failed", "commit_sha": reviewer.commit_sha,
+                       "error": f"{type(e).__name__}: {e}"})
+    finally:
+        if reviewer.project_directory:
+            shutil.rmtree(os.path.dirname(reviewer.project_directory), ignore_errors=True)
+    record["timing"] = {"total_s": round(time.perf_counter() - start, 2)}
+    record["tokens"] = token_usage.pop(session_id)
+    return record
+
+
+def run_batch(repo_urls: List[str], output: str, processes: int, llm_concurrency: int,
+              stage_timeout: float) -> dict:
+    """
+    Reviews the repositories not yet reviewed successfully in `output`, appending one record
+    per repository as soon as it finishes.
+
+    Returns:
+        dict: Summary of the whole cohort, including every failure.
+    """
+    done = {url for url, record in read_checkpoint(output).items() if record.get("status") == "ok"}
+    pending = [url for url in repo_urls if url not in done]
+    print(f"{len(repo_urls)} repositories, {len(done & set(repo_urls))} already reviewed, "
+          f"{len(pending)} to review", file=sys.stderr)
+
+    llm_semaphore = multiprocessing.BoundedSemaphore(llm_concurrency)
+    with open(output, "a", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=processes, initializer=init_worker, initargs=(llm_semaphore, processes, stage_timeout)
+    ) as pool:
+        if _ends_with_partial_line(output):
+            # Left by a crash: start the next record on a line of its own.
+            out.write("\n")
+        futures = {pool.submit(review_repo, url): url for url in pending}
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed for memory).
+                record = {"repo_url": futures[future], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            print(f"[{i}/{len(pending)}] {record['status']}: {record['repo_url']}", file=sys.stderr)
+
+    records = read_checkpoint(output)
+    cohort = [records[url] for url in repo_urls if url in records]
+    failures = [{"repo_url": r["repo_url"], "error": r.get("error")} for r in cohort if r["status"] != "ok"]
+    return {
+        "total": len(repo_urls),
+        "ok": len(cohort) - len(failures),
+        "failed": len(failures),
+        "prompt_tokens": sum(r.get("tokens", {}).get("prompt_tokens", 0) for r in cohort),
+        "completion_tokens": sum(r.get("tokens", {}).get("completion_tokens", 0) for r in cohort),
+        "failures": failures,
+    }
+
+
+def _ends_with_partial_line(path: str) -> bool:
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file listing the repository URLs")
+    parser.add_argument("--output", default="reviews.jsonl", help="JSONL file the reviews are appended to")
+    parser.add_argument("--processes", type=int, default=4, help="repositories reviewed in parallel")
+    parser.add_argument("--llm-concurrency", type=int, default=8,
+                        help="maximum LLM requests in flight across all processes")
+    parser.add_argument("--stage-timeout", type=float, default=3600,
+                        help="seconds each review stage may take before files are skipped")
+    args = parser.parse_args()
+
+    summary = run_batch(read_repo_urls(args.input), args.output, args.processes, args.llm_concurrency,
+                        args.stage_timeout)
+    summary_path = os.path.splitext(args.output)[0] + ".summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps({key: value for key, value in summary.items() if key != "failures"}))
+    for failure in summary["failures"]:
+        print(f"FAILED {failure['repo_url']}: {failure['error']}")
+    print(f"Summary written to {summary_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
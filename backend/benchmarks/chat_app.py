@@ -0,0 +1,22 @@
+"""
+The real Flask app, preloaded with reviewed sessions so /api/chat can be load tested
+without GitHub. Served by benchmarks/chat_concurrency.py.
+"""
+from langchain_core.messages import AIMessage
+from datetime import datetime
+
+import entrypoint
+from project_reviewer import ProjectReviewer
+
+SESSIONS = 256
+
+for i in range(SESSIONS):
+    reviewer = ProjectReviewer("https://github.com/load/test", f"load-{i}")
+    reviewer.file_data = [
+        {"path": "main.py", "code": "print('hello')\n" * 50, "summary": "Entry point of the project."},
+        {"path": "README.md", "code": "# Project\n", "summary": "Project documentation."},
+    ]
+    reviewer.chat_history.append(AIMessage(content="Overall the project looks good."))
+    entrypoint.llm_sessions[f"load-{i}"] = {"llm": reviewer, "last_accessed": datetime.now()}
+
+app = entrypoint.app
@@ -0,0 +1,139 @@
+"""
+Measures how many concurrent /api/chat requests a single gunicorn worker sustains with
+the default sync worker class compared with the gthread configuration of gunicorn.conf.py.
+
+The app runs against a local stub of the OpenAI API with a fixed latency, so the numbers
+reflect how well a worker overlaps LLM waits rather than model speed.
+
+Usage (from the backend directory):
+    python benchmarks/chat_concurrency.py --latency 0.5 --duration 15 --concurrency 1 8 32
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Tuple
+
+from stub_servers import StubOpenAIServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(worker_class: str, threads: int, openai_url: str) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, BENCHMARKS_DIR, os.environ.get("PYTHONPATH")])),
+        OPENAI_API_KEY="stub",
+        OPENAI_BASE_URL=openai_url,
+        OPENAI_API_BASE=openai_url,
+        OPENAI_RPM_LIMIT="1000000",
+        OPENAI_TPM_LIMIT="1000000000",
+        LLM_HEDGING_ENABLED="false",
+        # gunicorn silently switches sync workers with threads > 1 to gthread.
+        GUNICORN_THREADS=str(threads if worker_class == "gthread" else 1),
+        WEB_CONCURRENCY="1",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-k", worker_class,
+         "--bind", f"127.0.0.1:{port}", "chat_app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start")
+
+
+def run_clients(url: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(index: int) -> None:
+        body = json.dumps({"sessionId": f"load-{index}", "message": "Where is the entry point?"}).encode()
+        while time.monotonic() < stop_at:
+            start = time.monotonic()
+            request = urllib.request.Request(f"{url}/api/chat", data=body,
+                                             headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=600).read()
+                with lock:
+                    latencies.append(time.monotonic() - start)
+            except (urllib.error.URLError, OSError) as e:
+                with lock:
+                    errors.append(str(e))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else None
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_s": pick(0.50),
+        "p95_s": pick(0.95),
+        # Little's law: average number of requests in the system, queued or being served.
+        "sustained_concurrency": round(len(latencies) / elapsed * (sum(latencies) / len(latencies)), 1)
+        if latencies else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency per call, in seconds")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--threads", type=int, default=32, help="gunicorn threads for gthread")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(latency=args.latency).start()
+    results = []
+    try:
+        for worker_class in ("sync", "gthread"):
+            process, url = start_app(worker_class, args.threads, stub.base_url)
+            try:
+                for concurrency in args.concurrency:
+                    result = {"worker_class": worker_class, **run_clients(url, concurrency, args.duration)}
+                    print(json.dumps(result))
+                    results.append(result)
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        stub.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measures cold start: how long importing the app and warming it up take in a fresh
+interpreter, and how long gunicorn takes to answer /ready with and without preload,
+along with the memory (PSS, Linux only) the master and workers use together.
+
+Usage (from the backend directory):
+    python benchmarks/cold_start.py --workers 4 --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+from chat_concurrency import BACKEND_DIR, free_port
+
+IMPORT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import entrypoint
+imported = time.perf_counter()
+import warmup
+warmup.warm_up()
+warm = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "warm_up_s": warm - imported}))
+"""
+
+
+def measure_imports() -> dict:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=_env(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_gunicorn(preload: bool, workers: int) -> dict:
+    port = free_port()
+    env = _env(GUNICORN_PRELOAD=str(preload).lower(), WEB_CONCURRENCY=str(workers))
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+         "entrypoint:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        ready_s = None
+        while time.perf_counter() - start < 120:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=5)
+                ready_s = time.perf_counter() - start
+                break
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.05)
+        time.sleep(1)
+        return {"preload": preload, "ready_s": ready_s, "pss_mb": _total_pss_mb(process.pid)}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _total_pss_mb(pid: int) -> Optional[float]:
+    pids = [pid] + _children(pid)
+    try:
+        total_kb = 0
+        for p in pids:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        return round(total_kb / 1024, 1)
+    except (OSError, StopIteration):
+        return None
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _env(**overrides) -> dict:
+    return dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "stub"), **overrides)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    imports = [measure_imports() for _ in range(args.runs)]
+    results = {
+        "import_s": round(statistics.median(r["import_s"] for r in imports), 3),
+        "warm_up_s": round(statistics.median(r["warm_up_s"] for r in imports), 3),
+        "gunicorn": [],
+    }
+    for preload in (False, True):
+        runs = [measure_gunicorn(preload, args.workers) for _ in range(args.runs)]
+        results["gunicorn"].append({
+            "preload": preload,
+            "workers": args.workers,
+            "ready_s": round(statistics.median(r["ready_s"] for r in runs if r["ready_s"] is not None), 3),
+            "pss_mb": runs[-1]["pss_mb"],
+        })
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from model_service import count_tokens
+
+
+class ApproximateEncoding:
+    """
+    Stands in for a tiktoken encoding when its BPE data cannot be downloaded: about four
+    characters per token, which is close enough to compare two runs made the same way.
+    """
+    def encode(self, text: str) -> range:
+        return range((len(text) + 3) // 4)
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution of a fake LLM call, plus a delay per prompt token.
+
+    Args:
+        distribution (str): "constant", "uniform" (median / 2 to median * 1.5) or "lognormal".
+        median (float): Median base latency, in seconds.
+        sigma (float): Shape of the lognormal distribution (its tail).
+        per_token (float): Extra seconds per prompt token.
+        seed (int): Seed of the random generator, so runs are reproducible.
+    """
+    def __init__(self, distribution: str = "lognormal", median: float = 0.05, sigma: float = 0.5,
+                 per_token: float = 0.00001, seed: int = 0):
+        self.distribution = distribution
+        self.median = median
+        self.sigma = sigma
+        self.per_token = per_token
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, prompt_tokens: int) -> float:
+        with self._lock:
+            if self.distribution == "constant":
+                base = self.median
+            elif self.distribution == "uniform":
+                base = self._random.uniform(self.median / 2, self.median * 1.5)
+            elif self.distribution == "lognormal":
+                base = self._random.lognormvariate(0, self.sigma) * self.median
+            else:
+                raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        return base + prompt_tokens * self.per_token
+
+
+class UsageCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def as_dict(self) -> dict:
+        return {
+            "llm_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A local stand-in for ChatOpenAI returning deterministic answers after a simulated latency.
+
+    Answers are shaped like what each ModelService prompt expects: a JSON array for
+    requirement restructuring, file paths for relevant-file picking, prose otherwise.
+    """
+    latency: Any
+    usage: Any
+    completion_words: int = 150
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(message.content) for message in messages)
+        prompt_tokens = count_tokens(prompt)
+        time.sleep(self.latency.sample(prompt_tokens))
+
+        if "JSON array of strings" in prompt:
+            content = '["Load the dataset", "Clean the data", "Train a model", "Report the results"]'
+        elif "space-separated file paths" in prompt:
+            content = "main.py"
+        else:
+            content = " ".join(["lorem"] * self.completion_words)
+        self.usage.add(prompt_tokens, count_tokens(content))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
@@ -0,0 +1,244 @@
+"""
+HTTP load test of the real app served by gunicorn, against local GitHub and OpenAI stubs.
+
+Each virtual user analyzes a repository through /api/analyze and then asks a few follow-up
+questions through /api/chat in the same session, over and over. For every combination of
+gunicorn workers and concurrency it reports throughput, latency percentiles and error rates
+per endpoint, and how much the workers' memory grew per session created.
+
+Chat sessions live in the memory of the worker that ran the analysis, and gunicorn does not
+route requests by session. With several workers, chats that land on another worker get
+"Session not found": they are counted as `affinity_misses`, not as errors, and the memory
+growth per session is not reported since those chats never grew a session.
+
+Usage (from the backend directory):
+    python benchmarks/http_load.py --workers 1 --concurrency 4 16 --duration 60 \\
+        --openai-latency 0.2 --rate-limit-ratio 0.05
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple
+
+from chat_concurrency import BACKEND_DIR, free_port
+from cold_start import _children
+from stub_servers import StubGitHubServer, StubOpenAIServer
+from synthetic_repos import SCENARIOS
+
+QUESTIONS = [
+    "What are the most important issues to fix first?",
+    "How could the README be improved?",
+    "Is the data cleaning step correct?",
+]
+
+
+def start_app(workers: int, threads: int, github_url: str, openai_url: str,
+              flights_db: str, args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="stub",
+        OPENAI_BASE_URL=openai_url,
+        OPENAI_API_BASE=openai_url,
+        GITHUB_API_URL=github_url,
+        OPENAI_RPM_LIMIT=str(args.rpm),
+        OPENAI_TPM_LIMIT=str(args.tpm),
+        LLM_HEDGING_ENABLED=str(args.hedging).lower(),
+        SINGLE_FLIGHT_DB=flights_db,
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+         "entrypoint:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            urllib.request.urlopen(f"{url}/ready", timeout=5)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def post(url: str, payload: dict) -> Tuple[int, Optional[dict], float]:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=900) as response:
+            return response.status, json.loads(response.read()), time.monotonic() - start
+    except urllib.error.HTTPError as e:
+        try:
+            body = json.loads(e.read())
+        except ValueError:
+            body = None
+        return e.code, body, time.monotonic() - start
+    except (urllib.error.URLError, OSError):
+        return 0, None, time.monotonic() - start
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.affinity_misses = Counter()
+        self.sessions = 0
+
+    def record(self, endpoint: str, status: int, seconds: float, body: Optional[dict] = None) -> None:
+        with self._lock:
+            if status == 404 and "Session not found" in (body or {}).get("error", ""):
+                self.affinity_misses[endpoint] += 1
+                return
+            self.statuses[endpoint][status] += 1
+            if status == 200:
+                self.latencies[endpoint].append(seconds)
+            if endpoint == "analyze" and status == 200:
+                self.sessions += 1
+
+    def summary(self, elapsed: float) -> dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, statuses in self.statuses.items():
+                total = sum(statuses.values())
+                latencies = sorted(self.latencies[endpoint])
+                endpoints[endpoint] = {
+                    "requests": total,
+                    "throughput_rps": round(total / elapsed, 2),
+                    "error_rate": round(1 - statuses[200] / total, 3) if total else 0,
+                    "statuses": {str(status): count for status, count in sorted(statuses.items())},
+                    "affinity_misses": self.affinity_misses[endpoint],
+                    "p50_s": _percentile(latencies, 0.50),
+                    "p95_s": _percentile(latencies, 0.95),
+                    "p99_s": _percentile(latencies, 0.99),
+                }
+            return {"endpoints": endpoints, "sessions_created": self.sessions,
+                    "affinity_misses": sum(self.affinity_misses.values())}
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+def virtual_user(url: str, index: int, stop_at: float, recorder: Recorder, args: argparse.Namespace) -> None:
+    iteration = 0
+    while time.monotonic() < stop_at:
+        repo = args.scenario if args.shared_repo else f"{args.scenario}-{index}-{iteration}"
+        status, body, seconds = post(f"{url}/api/analyze", {"repoUrl": f"https://github.com/student/{repo}"})
+        recorder.record("analyze", status, seconds)
+        iteration += 1
+        if status != 200:
+            continue
+        for turn in range(args.chat_turns):
+            if time.monotonic() >= stop_at:
+                return
+            status, reply, seconds = post(f"{url}/api/chat", {"sessionId": body["sessionId"],
+                                                              "message": QUESTIONS[turn % len(QUESTIONS)]})
+            recorder.record("chat", status, seconds, reply)
+
+
+def workers_rss_mb(master_pid: int) -> float:
+    total_kb = 0
+    for pid in [master_pid] + _children(master_pid):
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            pass
+    return round(total_kb / 1024, 1)
+
+
+def run(workers: int, concurrency: int, github: StubGitHubServer, openai: StubOpenAIServer,
+        args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        process, url = start_app(workers, args.threads, github.url, openai.base_url,
+                                 os.path.join(tmp, "flights.sqlite3"), args)
+        try:
+            rss_start = workers_rss_mb(process.pid)
+            calls_start, limited_start = openai.calls, openai.rate_limited
+            recorder = Recorder()
+            stop_at = time.monotonic() + args.duration
+            users = [threading.Thread(target=virtual_user, args=(url, i, stop_at, recorder, args))
+                     for i in range(concurrency)]
+            started = time.monotonic()
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            elapsed = time.monotonic() - started
+            rss_end = workers_rss_mb(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+
+    summary = recorder.summary(elapsed)
+    sessions = summary["sessions_created"]
+    return {
+        "workers": workers,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 1),
+        **summary,
+        "openai_calls": openai.calls - calls_start,
+        "openai_429s": openai.rate_limited - limited_start,
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rss_end,
+        "rss_growth_per_session_kb": (round((rss_end - rss_start) * 1024 / sessions, 1)
+                                      if sessions and not summary["affinity_misses"] else None),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--threads", type=int, default=32, help="gunicorn threads per worker")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--duration", type=float, default=60, help="seconds per combination")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="typical")
+    parser.add_argument("--shared-repo", action="store_true",
+                        help="all users review the same repository (exercises coalescing)")
+    parser.add_argument("--chat-turns", type=int, default=3)
+    parser.add_argument("--openai-latency", type=float, default=0.2)
+    parser.add_argument("--openai-per-token-latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="fraction of calls answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429 answers, seconds")
+    parser.add_argument("--rpm", type=int, default=100000, help="OPENAI_RPM_LIMIT of the app")
+    parser.add_argument("--tpm", type=int, default=100000000, help="OPENAI_TPM_LIMIT of the app")
+    parser.add_argument("--hedging", action="store_true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    github = StubGitHubServer().start()
+    openai = StubOpenAIServer(latency=args.openai_latency, per_token_latency=args.openai_per_token_latency,
+                              rate_limit_ratio=args.rate_limit_ratio, retry_after=args.retry_after).start()
+    results = []
+    try:
+        for workers in args.workers:
+            for concurrency in args.concurrency:
+                result = run(workers, concurrency, github, openai, args)
+                print(json.dumps(result))
+                results.append(result)
+    finally:
+        github.stop()
+        openai.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
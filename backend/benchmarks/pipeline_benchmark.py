@@ -0,0 +1,181 @@
+"""
+Offline end-to-end benchmark of the review pipeline (clean_zip_file + analyze_project).
+
+GitHub is replaced by synthetic repository zips (see synthetic_repos.py) and the OpenAI
+model by a deterministic fake with configurable latency (see fake_llm.py). Each scenario
+runs in a fresh process and reports wall time, LLM calls, tokens, peak RSS and the disk
+used by the extracted repository.
+
+Tokens are counted with tiktoken like in the app. Its BPE data is downloaded on first use
+(or read from TIKTOKEN_CACHE_DIR); when neither works, tokens are estimated from the text
+length and the results say `"tokenizer": "estimate"`.
+
+Usage (from the backend directory):
+    python benchmarks/pipeline_benchmark.py --output before.json
+    python benchmarks/pipeline_benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from synthetic_repos import SCENARIOS, build_repo_zip
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+METRICS = ("wall_s", "llm_calls", "prompt_tokens", "completion_tokens", "peak_rss_mb", "disk_mb")
+
+
+def run_scenario(args: argparse.Namespace) -> dict:
+    # Set before the app modules read their configuration at import time.
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ["OPENAI_RPM_LIMIT"] = "1000000"
+    os.environ["OPENAI_TPM_LIMIT"] = "1000000000"
+    os.environ["LLM_HEDGING_ENABLED"] = str(args.hedging).lower()
+    sys.path.insert(0, BACKEND_DIR)
+
+    import model_service
+    import repository_extraction
+    from project_analyzer import analyze_project
+    from fake_llm import ApproximateEncoding, FakeChatModel, LatencyModel, UsageCounter
+
+    tokenizer = "tiktoken"
+    try:
+        model_service.count_tokens("probe")
+    except Exception as e:
+        print(f"tiktoken data unavailable ({type(e).__name__}), estimating tokens from text length",
+              file=sys.stderr)
+        model_service._encoding = lambda model: ApproximateEncoding()
+        tokenizer = "estimate"
+
+    usage = UsageCounter()
+    fake = FakeChatModel(
+        latency=LatencyModel(args.latency_dist, args.latency_median, args.latency_sigma,
+                             args.per_token_latency, args.seed),
+        usage=usage,
+    )
+    model_service.ModelService._init_model = lambda self, model=None: fake
+    repo_zip = build_repo_zip(args.scenario, args.seed).getvalue()
+    repository_extraction.download_repo = lambda repo_url, branch="main": io.BytesIO(repo_zip)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        project = repository_extraction.clean_zip_file(f"https://github.com/student/{args.scenario}")
+        _, file_data = analyze_project(project["project_directory"], project["requirements"],
+                                       project["description"])
+    wall = time.perf_counter() - start
+
+    extracted_root = os.path.dirname(project["project_directory"])
+    disk_bytes = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(extracted_root)
+        for name in files
+    )
+    shutil.rmtree(extracted_root, ignore_errors=True)
+
+    return {
+        "wall_s": round(wall, 3),
+        **usage.as_dict(),
+        "files_analyzed": len(file_data),
+        "tokenizer": tokenizer,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "disk_mb": round(disk_bytes / 1024 / 1024, 1),
+    }
+
+
+def run_all(args: argparse.Namespace, passthrough: list) -> dict:
+    results = {}
+    for scenario in args.scenarios:
+        print(f"Running scenario {scenario}...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--scenario", scenario] + passthrough,
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            results[scenario] = {"error": completed.stderr.strip().splitlines()[-1:]}
+            continue
+        results[scenario] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "commit": _git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {
+            "latency_dist": args.latency_dist,
+            "latency_median": args.latency_median,
+            "latency_sigma": args.latency_sigma,
+            "per_token_latency": args.per_token_latency,
+            "hedging": args.hedging,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> None:
+    print(f"\nCompared with {baseline.get('commit', '?')[:10]}:")
+    for scenario, metrics in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before or "error" in metrics or "error" in before:
+            continue
+        if before.get("tokenizer") != metrics.get("tokenizer"):
+            print(f"  {scenario}: tokens counted with {before.get('tokenizer')} before and "
+                  f"{metrics.get('tokenizer')} now, token counts are not comparable")
+        changes = []
+        for metric in METRICS:
+            old, new = before.get(metric), metrics.get(metric)
+            if old:
+                changes.append(f"{metric} {old} -> {new} ({(new - old) / old:+.1%})")
+        print(f"  {scenario}: " + ", ".join(changes))
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--latency-dist", choices=["constant", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-median", type=float, default=0.05, help="seconds per LLM call")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal tail shape")
+    parser.add_argument("--per-token-latency", type=float, default=0.00001, help="seconds per prompt token")
+    parser.add_argument("--hedging", action="store_true", help="enable hedged requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results JSON of a previous run to compare with")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args)))
+        return
+
+    passthrough = [
+        "--latency-dist", args.latency_dist, "--latency-median", str(args.latency_median),
+        "--latency-sigma", str(args.latency_sigma), "--per-token-latency", str(args.per_token_latency),
+        "--seed", str(args.seed),
+    ] + (["--hedging"] if args.hedging else [])
+    results = run_all(args, passthrough)
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic_repos import SCENARIOS, build_repo_zip
+
+
+class _StubServer:
+    handler = None
+
+    def __init__(self, port: int = 0):
+        handler = type("Handler", (self.handler,), {"stub": self})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    stub = None
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+        self.send_bytes(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def send_bytes(self, status: int, body: bytes, content_type: str, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOpenAIServer(_StubServer):
+    """
+    A local server implementing the OpenAI chat completions endpoint.
+
+    Every call waits `latency` seconds plus `per_token_latency` per prompt word. A fraction
+    `rate_limit_ratio` of calls is rejected with 429 and a `Retry-After` header, like the
+    real API when over its limits. Requests with `"stream": true` get server-sent events.
+
+    Point the app at it with OPENAI_BASE_URL / OPENAI_API_BASE = `server.base_url`.
+    """
+    def __init__(self, latency: float = 0.5, per_token_latency: float = 0.0,
+                 rate_limit_ratio: float = 0.0, retry_after: float = 1.0, seed: int = 0, port: int = 0):
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.calls = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.handler = _OpenAIHandler
+        super().__init__(port)
+        self.base_url = f"{self.url}/v1"
+
+    def should_rate_limit(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            limited = self._random.random() < self.rate_limit_ratio
+            self.rate_limited += limited
+            return limited
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        if self.stub.should_rate_limit():
+            self.send_json(429, {"error": {"message": "Rate limit reached for requests",
+                                           "type": "requests", "code": "rate_limit_exceeded"}},
+                           {"retry-after": str(self.stub.retry_after),
+                            "retry-after-ms": str(int(self.stub.retry_after * 1000))})
+            return
+
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        time.sleep(self.stub.latency + len(prompt.split()) * self.stub.per_token_latency)
+        content = _completion_for(prompt)
+        model = body.get("model", "stub")
+        if body.get("stream"):
+            self._stream(model, content)
+            return
+        self.send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(content.split()),
+                      "total_tokens": len(prompt.split()) + len(content.split())},
+        })
+
+    def _stream(self, model: str, content: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                             "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        done = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+        self.close_connection = True
+
+
+def _completion_for(prompt: str) -> str:
+    # Shaped like what each ModelService prompt expects.
+    if "JSON array of strings" in prompt:
+        return '["Load the dataset", "Clean the data", "Train a model", "Report the results"]'
+    if "space-separated file paths" in prompt:
+        return "README.md"
+    return " ".join(["lorem"] * 150)
+
+
+class StubGitHubServer(_StubServer):
+    """
+    A local server implementing the two GitHub API endpoints the app uses: resolving a
+    branch to a commit SHA and downloading a zipball.
+
+    The repository name selects the synthetic scenario (see synthetic_repos.py): any name
+    starting with a scenario name, e.g. "typical-17", serves that scenario. Point the app at
+    it with GITHUB_API_URL = `server.url`.
+    """
+    def __init__(self, port: int = 0):
+        self.handler = _GitHubHandler
+        self._zips = {}
+        self._lock = threading.Lock()
+        super().__init__(port)
+
+    def zip_for(self, scenario: str) -> bytes:
+        with self._lock:
+            if scenario not in self._zips:
+                self._zips[scenario] = build_repo_zip(scenario).getvalue()
+            return self._zips[scenario]
+
+
+class _GitHubHandler(_Handler):
+    route = re.compile(r"^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/(?P<kind>commits|zipball)/(?P<ref>[^/?]+)")
+
+    def do_GET(self):
+        match = self.route.match(self.path)
+        scenario = next((name for name in SCENARIOS if match and match["repo"].startswith(name)), None)
+        if scenario is None:
+            self.send_json(404, {"message": "Not Found"})
+            return
+        if match["kind"] == "commits":
+            sha = hashlib.sha1(f"{match['owner']}/{match['repo']}@{match['ref']}".encode()).hexdigest()
+            self.send_bytes(200, sha.encode(), "application/vnd.github.sha")
+        else:
+            self.send_bytes(200, self.stub.zip_for(scenario), "application/zip")
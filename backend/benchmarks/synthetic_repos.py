@@ -0,0 +1,106 @@
+import base64
+import io
+import json
+import random
+import zipfile
+from typing import Callable, Dict
+
+TASK_DESCRIPTION = """# Sprint project
+
+You will build a small data science project that loads a dataset, cleans it, trains a model
+and presents the results in a notebook.
+
+## Requirements
+- Load the dataset from a CSV file and explore it.
+- Clean missing values and outliers.
+- Train and evaluate at least two models.
+- Present the findings with plots and a written conclusion.
+
+## Evaluation criteria
+- Code quality and structure.
+"""
+
+
+def python_module(rng: random.Random, functions: int) -> str:
+    lines = ["import math", ""]
+    for i in range(functions):
+        lines += [
+            f"def compute_{i}(values):",
+            f'    """Computes statistic {i} of the values."""',
+            f"    total = sum(v * {rng.randint(1, 9)} for v in values)",
+            "    return math.sqrt(abs(total)) / max(len(values), 1)",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def notebook(rng: random.Random, cells: int, output_kb: int) -> str:
+    image = base64.b64encode(rng.randbytes(output_kb * 1024)).decode()
+    nb_cells = []
+    for i in range(cells):
+        nb_cells.append({"cell_type": "markdown", "metadata": {}, "source": [f"## Step {i}\n", "Explanation."]})
+        nb_cells.append({
+            "cell_type": "code", "execution_count": i + 1, "metadata": {},
+            "source": [f"df_{i} = df.groupby('col_{i % 7}').mean()\n", f"df_{i}.plot()"],
+            "outputs": [{"output_type": "display_data", "metadata": {},
+                         "data": {"image/png": image, "text/plain": ["<Figure>"]}}],
+        })
+    return json.dumps({"cells": nb_cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 5})
+
+
+def csv_data(rng: random.Random, rows: int) -> str:
+    header = "id,feature_a,feature_b,feature_c,label\n"
+    return header + "".join(
+        f"{i},{rng.random():.6f},{rng.random():.6f},{rng.randint(0, 1000)},{rng.choice('AB')}\n"
+        for i in range(rows)
+    )
+
+
+def typical(rng: random.Random) -> Dict[str, str]:
+    files = {f"src/module_{i}.py": python_module(rng, 12) for i in range(6)}
+    files["analysis.ipynb"] = notebook(rng, 30, 20)
+    files["README.md"] = "# Project\n\nHow to run the analysis.\n" * 10
+    files["requirements.txt"] = "pandas\nscikit-learn\nmatplotlib\n"
+    files["data/train.csv"] = csv_data(rng, 5000)
+    return files
+
+
+def many_small_files(rng: random.Random) -> Dict[str, str]:
+    return {f"package_{i % 10}/module_{i}.py": python_module(rng, 3) for i in range(300)}
+
+
+def huge_notebooks(rng: random.Random) -> Dict[str, str]:
+    files = {f"notebook_{i}.ipynb": notebook(rng, 150, 60) for i in range(3)}
+    files["README.md"] = "# Notebooks\n"
+    return files
+
+
+def data_heavy(rng: random.Random) -> Dict[str, str]:
+    files = {f"src/pipeline_{i}.py": python_module(rng, 8) for i in range(5)}
+    files.update({f"data/raw_{i}.csv": csv_data(rng, 200000) for i in range(5)})
+    files["data/notes.txt"] = csv_data(rng, 2000)
+    return files
+
+
+SCENARIOS: Dict[str, Callable[[random.Random], Dict[str, str]]] = {
+    "typical": typical,
+    "many_small_files": many_small_files,
+    "huge_notebooks": huge_notebooks,
+    "data_heavy": data_heavy,
+}
+
+
+def build_repo_zip(scenario: str, seed: int = 0) -> io.BytesIO:
+    """
+    Builds a zip shaped like a GitHub zipball (a single top-level directory) containing a
+    Turing College task description and the files of `scenario`.
+    """
+    rng = random.Random(seed)
+    files = SCENARIOS[scenario](rng)
+    files["115.md"] = TASK_DESCRIPTION
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for path, content in files.items():
+            zip_file.writestr(f"student-{scenario}-0000000/{path}", content)
+    buffer.seek(0)
+    return buffer
@@ -1 +1,62 @@
-DEFAULT_MODEL = "gpt-4.1-mini"
\ No newline at end of file
+import os
+import tempfile
+import dotenv
+
+dotenv.load_dotenv()
+
+DEFAULT_MODEL = "gpt-4.1-mini"
+# Model used by each ModelService method; methods not listed use DEFAULT_MODEL.
+MODEL_ROUTES = {
+    "extract_project_description": "gpt-4.1-nano",
+    "restructure_requirements": "gpt-4.1-nano",
+    "summarize_file": "gpt-4.1-nano",
+    "get_relevant_files": "gpt-4.1-nano",
+    "analyze_file_quality": DEFAULT_MODEL,
+    "generate_final_feedback": DEFAULT_MODEL,
+    "generate_response": DEFAULT_MODEL,
+}
+# Used when the routed model fails.
+FALLBACK_MODEL = DEFAULT_MODEL
+# Used when a prompt does not fit the routed model's window, if its own window is larger.
+# The gpt-4.1 models all have the same window, so prompts too large for them are rejected
+# before being sent; route a stage to a smaller-window model to make the upgrade useful.
+LARGE_CONTEXT_MODEL = "gpt-4.1"
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "gpt-4.1-nano": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# OpenAI account limits, split between the worker processes (see llm_scheduler.py).
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", 500))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", 200000))
+# Completion tokens reserved per call on top of the prompt when estimating its cost.
+EXPECTED_COMPLETION_TOKENS = 1000
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE_SECONDS = 1.0
+LLM_BACKOFF_MAX_SECONDS = 60.0
+
+# Hedged requests: once a stage has enough samples, a call slower than its observed
+# percentile gets a duplicate request, limited to a fraction of all calls.
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_BUDGET_RATIO = 0.05
+LATENCY_WINDOW = 500
+# Threads running LLM calls; must cover the gunicorn threads of a worker plus hedges.
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", 64))
+# Per-stage deadlines of a review; files not processed in time are marked as not analyzed.
+SUMMARY_STAGE_TIMEOUT_SECONDS = 180
+ANALYSIS_STAGE_TIMEOUT_SECONDS = 240
+
+# Coalescing of concurrent reviews of the same commit, shared across workers (see single_flight.py).
+SINGLE_FLIGHT_DB = os.getenv("SINGLE_FLIGHT_DB", os.path.join(tempfile.gettempdir(), "ai-reviewer-flights.sqlite3"))
+# Renewed by the leader every third of its length while the review runs, so a lease only
+# expires if its worker died.
+SINGLE_FLIGHT_LEASE_SECONDS = 60
+SINGLE_FLIGHT_RESULT_TTL_SECONDS = 300
+SINGLE_FLIGHT_POLL_SECONDS = 1.0
@@ -1,7 +1,12 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, abort
 from flask_cors import CORS
 import os
+import threading
 from project_reviewer import ProjectReviewer
+from llm_scheduler import RateLimitExceeded
+from llm_hedging import latency_tracker
+from static_assets import StaticAssets
+import warmup
 from uuid import uuid4
 from datetime import datetime, timedelta
 import dotenv
@@ -18,8 +23,11 @@ log = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder="static")
 CORS(app, supports_credentials=True, origins="*")
+static_assets = StaticAssets(app.static_folder)
 
 llm_sessions = {}
+# Requests are served by several threads per worker (see gunicorn.conf.py).
+sessions_lock = threading.Lock()
 
 
 @app.route("/api/analyze", methods=["POST"])
@@ -40,8 +48,6 @@ def analyze_repo():
         ), 500
 
     session_id = request.json.get("sessionId", str(uuid4()))
-    ask_llm = ProjectReviewer(repo_url)
-    ask_llm.extract_files()
 
     if not repo_url:
         return jsonify({"error": "Repository URL and message are required"}), 400
@@ -52,10 +58,16 @@ def analyze_repo():
             repo_url,
             session_id,
         )
-        message = ask_llm.analyze_project()
-        llm_sessions[session_id] = {"llm": ask_llm, "last_accessed": datetime.now()}
+        ask_llm = ProjectReviewer(repo_url, session_id)
+        message = ask_llm.review()
+        with sessions_lock:
+            llm_sessions[session_id] = {"llm": ask_llm, "last_accessed": datetime.now()}
         return jsonify({"response": message, "sessionId": session_id}), 200
 
+    except RateLimitExceeded as e:
+        log.warning("Rate limited in /api/analyze: %s", str(e))
+        return rate_limited_response(e)
+
     except Exception as e:
         log.error("Exception in /api/analyze: %s", str(e))
         return jsonify({"error": str(e)}), 500
@@ -67,8 +79,12 @@ def chat():
     data = request.json
     session_id = data.get("sessionId")
     user_message = data.get("message")
-    ask_llm = llm_sessions[session_id]["llm"]
-    llm_sessions[session_id]["last_accessed"] = datetime.now()
+    with sessions_lock:
+        session = llm_sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "Session not found, please analyze the repository again"}), 404
+        session["last_accessed"] = datetime.now()
+    ask_llm = session["llm"]
 
     if not user_message:
         return jsonify({"error": "Message is required"}), 400
@@ -77,36 +93,60 @@ def chat():
         reply = ask_llm.ask_followup(user_message)
         return jsonify({"response": reply}), 200
 
+    except RateLimitExceeded as e:
+        log.warning("Rate limited in /api/chat: %s", str(e))
+        return rate_limited_response(e)
+
     except Exception as e:
         log.error("Exception in /api/chat: %s", str(e))
         return jsonify({"error": str(e)}), 500
 
 
+def rate_limited_response(error: RateLimitExceeded):
+    response = jsonify({"error": str(error)})
+    response.headers["Retry-After"] = str(int(error.retry_after) + 1)
+    return response, 429
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint."""
     return jsonify({"status": "healthy"}), 200
 
 
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness endpoint: 200 once the gunicorn hooks have warmed the worker up, 503 before."""
+    status = warmup.status()
+    return jsonify(status), 200 if status["warm"] else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """LLM call counters and p50/p99 latencies per stage."""
+    return jsonify(latency_tracker.snapshot()), 200
+
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve(path):
-    if path and os.path.exists(app.static_folder + "/" + path):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, "index.html")
+    response = static_assets.response(path, request) or static_assets.response("index.html", request)
+    if response is None:
+        abort(404)
+    return response
 
 
 def cleanup_sessions(timeout_minutes=30):
     now = datetime.now()
-    expired = [
-        sid
-        for sid, data in llm_sessions.items()
-        if now - data["last_accessed"] > timedelta(minutes=timeout_minutes)
-    ]
-    for sid in expired:
-        print(f"Cleaning up session {sid}")
-        del llm_sessions[sid]
+    with sessions_lock:
+        expired = [
+            sid
+            for sid, data in llm_sessions.items()
+            if now - data["last_accessed"] > timedelta(minutes=timeout_minutes)
+        ]
+        for sid in expired:
+            print(f"Cleaning up session {sid}")
+            del llm_sessions[sid]
 
 
 @app.before_request
@@ -127,5 +167,6 @@ def log_sessions():
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 3000))
     log.info("Starting flask server...")
-    app.run(host="0.0.0.0", port=port, debug=True)
+    warmup.warm_up()
+    app.run(host="0.0.0.0", port=port, debug=True, threaded=True)
     log.info(f"Server running at http://localhost:{port}")
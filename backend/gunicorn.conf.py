@@ -0,0 +1,36 @@
+import os
+
+# Reviews and chats spend almost all their time waiting on GitHub and OpenAI, so each
+# worker serves many requests with threads instead of pinning a process per request.
+# Chat sessions live in the memory of the worker that ran the analysis: keep a single
+# worker unless requests are routed to workers by session.
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+# With gthread this only restarts a worker whose main loop stops heartbeating: it does not
+# bound how long a request runs. Reviews are limited by the summary and analysis stage
+# deadlines (constants.py), but extraction and the other LLM calls have no overall limit.
+timeout = 600
+# Import the app in the master before forking, so workers share its modules copy-on-write.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    # Runs in the master before workers are forked; they inherit the warm state.
+    import warmup
+    warmup.warm_up()
+
+
+def post_fork(server, worker):
+    # The OpenAI account limits are shared by all workers: each one schedules its share.
+    import constants
+    from llm_scheduler import scheduler
+    scheduler.set_limits(max(1, constants.OPENAI_RPM_LIMIT // server.cfg.workers),
+                         max(1, constants.OPENAI_TPM_LIMIT // server.cfg.workers))
+
+
+def post_worker_init(worker):
+    # No-op when inherited from the master; otherwise warms the worker before it serves.
+    import warmup
+    warmup.warm_up()
@@ -0,0 +1,180 @@
+import math
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+import constants
+from llm_scheduler import DeadlineExceeded
+
+T = TypeVar("T")
+
+
+def percentile(samples, q: float) -> Optional[float]:
+    """
+    Returns the nearest-rank `q`-th percentile of `samples`, or None if there are none.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """
+    Keeps a rolling window of LLM call latencies and counters per stage.
+
+    Two latencies are recorded for every call: the primary latency (how long the first
+    request took, whether or not it was hedged) and the observed latency (how long the
+    caller actually waited). Comparing their percentiles shows the effect of hedging.
+    """
+    def __init__(self, window: int = constants.LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._primary = defaultdict(lambda: deque(maxlen=window))
+        self._observed = defaultdict(lambda: deque(maxlen=window))
+        self._counters = defaultdict(Counter)
+
+    def record_primary(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._primary[stage].append(seconds)
+
+    def record_observed(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._observed[stage].append(seconds)
+
+    def increment(self, stage: str, counter: str) -> None:
+        with self._lock:
+            self._counters[stage][counter] += 1
+
+    def primary_percentile(self, stage: str, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = list(self._primary[stage])
+        return percentile(samples, q) if len(samples) >= min_samples else None
+
+    def total(self, counter: str) -> int:
+        with self._lock:
+            return sum(counters[counter] for counters in self._counters.values())
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Returns per-stage counters and p50/p99 latencies, in seconds.
+        """
+        with self._lock:
+            stages = set(self._primary) | set(self._observed) | set(self._counters)
+            return {
+                stage: {
+                    "calls": self._counters[stage]["calls"],
+                    "hedges": self._counters[stage]["hedges"],
+                    "hedge_wins": self._counters[stage]["hedge_wins"],
+                    "deadline_misses": self._counters[stage]["deadline_misses"],
+                    "primary_p50": percentile(self._primary[stage], 50),
+                    "primary_p99": percentile(self._primary[stage], 99),
+                    "observed_p50": percentile(self._observed[stage], 50),
+                    "observed_p99": percentile(self._observed[stage], 99),
+                }
+                for stage in sorted(stages)
+            }
+
+
+class Hedger:
+    """
+    Runs LLM requests with an optional deadline and hedging.
+
+    If a request is still running after the stage's observed p95 latency, a duplicate request
+    is fired and the first successful answer wins. Hedges are limited to a fraction of all
+    calls so that a slow API does not double the load on it. Only the HTTP request itself is
+    timed and hedged: callers go through the scheduler first (see ModelService._call_model).
+    """
+    def __init__(self, tracker: LatencyTracker, executor: ThreadPoolExecutor,
+                 enabled: bool = constants.LLM_HEDGING_ENABLED,
+                 hedge_percentile: float = constants.HEDGE_PERCENTILE,
+                 min_samples: int = constants.HEDGE_MIN_SAMPLES,
+                 budget_ratio: float = constants.HEDGE_BUDGET_RATIO):
+        self.tracker = tracker
+        self.executor = executor
+        self.enabled = enabled
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self._budget_lock = threading.Lock()
+
+    def call(self, stage: str, fn: Callable[[], T], deadline: Optional[float] = None,
+             admit_hedge: Optional[Callable[[], bool]] = None) -> T:
+        """
+        Calls `fn`, hedging it if it is slow, and gives up once `deadline` passes.
+
+        Requests still running when the deadline passes are not cancelled: they finish in the
+        executor and their results are discarded.
+
+        Args:
+            stage (str): Name of the pipeline stage, used to group latencies.
+            fn (Callable[[], T]): The LLM request. It must be safe to run twice concurrently.
+            deadline (Optional[float]): `time.monotonic()` value after which the call is given up.
+            admit_hedge (Optional[Callable[[], bool]]): Asked before firing a hedge, e.g.
+                LLMScheduler.try_acquire; no hedge is fired if it returns False.
+
+        Returns:
+            T: The first successful result.
+
+        Raises:
+            DeadlineExceeded: If no request finished before the deadline.
+        """
+        start = time.monotonic()
+        self.tracker.increment(stage, "calls")
+        if deadline is not None and start >= deadline:
+            self.tracker.increment(stage, "deadline_misses")
+            raise DeadlineExceeded(f"Deadline of stage '{stage}' already passed.")
+
+        primary = self.executor.submit(fn)
+        primary.add_done_callback(lambda future: self._on_primary_done(stage, start, future))
+        pending = {primary}
+        hedge = None
+
+        hedge_after = self._hedge_delay(stage)
+        if hedge_after is not None and (deadline is None or start + hedge_after < deadline):
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done and self._take_hedge_budget(stage, admit_hedge):
+                print(f"Hedging slow '{stage}' call after {hedge_after:.2f}s")
+                hedge = self.executor.submit(fn)
+                pending.add(hedge)
+
+        error = None
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                self.tracker.increment(stage, "deadline_misses")
+                raise DeadlineExceeded(f"Stage '{stage}' did not finish before its deadline.")
+            for future in done:
+                if future.exception() is None:
+                    self.tracker.record_observed(stage, time.monotonic() - start)
+                    if future is hedge:
+                        self.tracker.increment(stage, "hedge_wins")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def _hedge_delay(self, stage: str) -> Optional[float]:
+        if not self.enabled:
+            return None
+        return self.tracker.primary_percentile(stage, self.hedge_percentile, self.min_samples)
+
+    def _take_hedge_budget(self, stage: str, admit_hedge: Optional[Callable[[], bool]]) -> bool:
+        with self._budget_lock:
+            if self.tracker.total("hedges") >= self.budget_ratio * self.tracker.total("calls"):
+                return False
+            if admit_hedge is not None and not admit_hedge():
+                return False
+            self.tracker.increment(stage, "hedges")
+            return True
+
+    def _on_primary_done(self, stage: str, start: float, future: Future) -> None:
+        if future.exception() is None:
+            self.tracker.record_primary(stage, time.monotonic() - start)
+
+
+latency_tracker = LatencyTracker()
+hedger = Hedger(latency_tracker, ThreadPoolExecutor(max_workers=constants.LLM_EXECUTOR_WORKERS,
+                                                    thread_name_prefix="llm"))
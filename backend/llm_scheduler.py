@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Callable, Optional, TypeVar, TYPE_CHECKING
+
+import constants
+
+if TYPE_CHECKING:
+    import openai
+
+T = TypeVar("T")
+
+# Lower value is served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when an LLM call cannot complete before the deadline of its stage.
+    """
+
+
+class RateLimitExceeded(RuntimeError):
+    """
+    Raised when the OpenAI API keeps rejecting a call with 429 after all retries.
+    """
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `capacity` units per minute.
+    """
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """
+        Returns the number of seconds until `amount` units are available (0 if they already are).
+        """
+        self._refill(now)
+        missing = amount - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def consume(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= amount
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls against the account's requests-per-minute and tokens-per-minute limits.
+
+    Waiting calls are ordered by priority class first, then by a per-session virtual finish
+    time (weighted fair queuing on estimated tokens), so a session that submits many large
+    prompts cannot starve other sessions of the same priority. Calls rejected with 429 are
+    retried with jittered exponential backoff, honoring the `Retry-After` header, and pause
+    admission for every caller while the API asks us to back off.
+
+    The limits are per process: gunicorn.conf.py and batch_review.py give each worker process
+    its share of the account limits with set_limits().
+    """
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int,
+                 max_retries: int = constants.LLM_MAX_RETRIES,
+                 backoff_base: float = constants.LLM_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = constants.LLM_BACKOFF_MAX_SECONDS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._session_finish = {}
+        self._virtual_time = 0.0
+        self._paused_until = 0.0
+        self._concurrency = None
+
+    def set_limits(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        """
+        Replaces the rate limits, e.g. with this process's share when several processes
+        use the same account.
+        """
+        with self._cond:
+            self.requests = TokenBucket(requests_per_minute)
+            self.tokens = TokenBucket(tokens_per_minute)
+
+    def limit_concurrency(self, semaphore) -> None:
+        """
+        Caps the number of API requests in flight with `semaphore`, which may be shared
+        with other processes (e.g. a multiprocessing.BoundedSemaphore). Every request holds
+        it through request_slot(), hedges and requests abandoned at a deadline included.
+        """
+        self._concurrency = semaphore
+
+    def request_slot(self):
+        """
+        Returns the context manager an API request holds while it runs (see limit_concurrency).
+        """
+        return self._concurrency or nullcontext()
+
+    def try_acquire(self, cost: int) -> bool:
+        """
+        Admits an extra request, such as a hedge, only if it can be sent right away: admission
+        is not paused by a 429, no call is waiting and the rate limits have capacity for it.
+
+        Returns:
+            bool: Whether the request was admitted (and its cost consumed).
+        """
+        cost = min(cost, self.tokens.capacity)
+        with self._cond:
+            now = time.monotonic()
+            if (self._waiters or self._paused_until > now
+                    or self.requests.time_until(1, now) > 0 or self.tokens.time_until(cost, now) > 0):
+                return False
+            self.requests.consume(1, now)
+            self.tokens.consume(cost, now)
+            return True
+
+    def run(self, call: Callable[[], T], cost: int, priority: int = PRIORITY_BACKGROUND,
+            session_id: Optional[str] = None, deadline: Optional[float] = None) -> T:
+        """
+        Runs `call` once the rate limits allow it, retrying on 429 responses.
+
+        Args:
+            call (Callable[[], T]): The function performing the API request.
+            cost (int): Estimated number of tokens (prompt and completion) the call uses.
+            priority (int): PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND.
+            session_id (Optional[str]): Session the call belongs to, used for fairness.
+            deadline (Optional[float]): `time.monotonic()` value after which the call is given up.
+
+        Returns:
+            T: Whatever `call` returns.
+
+        Raises:
+            RateLimitExceeded: If the call is still rate limited after all retries.
+            DeadlineExceeded: If the deadline passes before the call can be admitted.
+        """
+        cost = min(cost, self.tokens.capacity)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(cost, priority, session_id, deadline)
+            try:
+                return call()
+            except Exception as e:
+                import openai  # already loaded by the failed call
+                if not isinstance(e, openai.RateLimitError):
+                    raise
+                if getattr(e, "code", None) == "insufficient_quota":
+                    raise
+                retry_after = _retry_after_seconds(e)
+                if retry_after is not None:
+                    self._pause(retry_after)
+                    delay = retry_after + random.uniform(0, self.backoff_base)
+                else:
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded("OpenAI rate limit exceeded, please retry later.",
+                                            retry_after=max(delay, self.backoff_base)) from e
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    raise DeadlineExceeded("Deadline reached while backing off from rate limits.") from e
+                print(f"Rate limited by OpenAI (attempt {attempt + 1}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _acquire(self, cost: float, priority: int, session_id: Optional[str],
+                 deadline: Optional[float]) -> None:
+        with self._cond:
+            previous_finish = self._session_finish.get(session_id)
+            start = max(self._virtual_time, previous_finish or 0.0)
+            self._session_finish[session_id] = start + cost
+            entry = (priority, start + cost, next(self._counter))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    remaining = deadline - now if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        # The call is never sent: do not charge its cost to the session, unless
+                        # a later call of the session was already queued behind it.
+                        if self._session_finish.get(session_id) == start + cost:
+                            if previous_finish is None:
+                                del self._session_finish[session_id]
+                            else:
+                                self._session_finish[session_id] = previous_finish
+                        raise DeadlineExceeded("Deadline reached while waiting for rate limit capacity.")
+                    if self._waiters[0] != entry:
+                        self._cond.wait(remaining)
+                        continue
+                    wait = max(self._paused_until - now,
+                               self.requests.time_until(1, now),
+                               self.tokens.time_until(cost, now))
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait if remaining is None else min(wait, remaining))
+                self.requests.consume(1, now)
+                self.tokens.consume(cost, now)
+                self._virtual_time = start
+                self._session_finish = {
+                    sid: finish for sid, finish in self._session_finish.items()
+                    if finish > self._virtual_time
+                }
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(error: "openai.APIStatusError") -> Optional[float]:
+    """
+    Reads the delay requested by the API from the `retry-after-ms` or `retry-after` headers.
+    """
+    headers = error.response.headers if getattr(error, "response", None) is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+scheduler = LLMScheduler(constants.OPENAI_RPM_LIMIT, constants.OPENAI_TPM_LIMIT)
@@ -1,25 +1,164 @@
-from langchain.chat_models import ChatOpenAI
 import constants
 from langchain_core.prompts import PromptTemplate
 import json
-from langchain.schema import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 import tiktoken
-
-def count_tokens(text: str, model: str = "gpt-4"):
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
-
-class ModelService:
+import threading
+from functools import lru_cache
+from typing import Callable, Optional, TYPE_CHECKING
+from llm_scheduler import scheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from llm_hedging import hedger
+
+if TYPE_CHECKING:
+    from langchain_community.chat_models import ChatOpenAI
+
+# Clients are expensive to build (HTTP client, SSL context) and thread-safe, so all
+# ModelService instances in the process share one per model.
+_models = {}
+_models_lock = threading.Lock()
+
+class TokenUsage:
+    """
+    Counts the prompt and completion tokens (as measured by count_tokens) used by the
+    sessions that asked to be tracked.
+    """
     def __init__(self):
-        self.llm = self._init_model()
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def track(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions[session_id] = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def record(self, session_id: Optional[str], prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            usage = self._sessions.get(session_id)
+            if usage is not None:
+                usage["calls"] += 1
+                usage["prompt_tokens"] += prompt_tokens
+                usage["completion_tokens"] += completion_tokens
+
+    def pop(self, session_id: str) -> dict:
+        with self._lock:
+            return self._sessions.pop(session_id, {})
+
+token_usage = TokenUsage()
+
+class ContextWindowExceeded(ValueError):
+    """
+    Raised when a prompt does not fit the context window of any model it may be sent to.
+    """
+
+def count_tokens(text: str, model: str = constants.DEFAULT_MODEL) -> int:
+    return len(_encoding(model).encode(text))
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> "tiktoken.Encoding":
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Models newer than the installed tiktoken, like the gpt-4.1 family, use o200k.
+        return tiktoken.get_encoding("o200k_base")
+
+def routed_model(stage: str) -> str:
+    """
+    Returns the model configured for `stage` in constants.MODEL_ROUTES.
+    """
+    return constants.MODEL_ROUTES.get(stage, constants.DEFAULT_MODEL)
+
+def larger_context_model(model: str) -> Optional[str]:
+    """
+    Returns constants.LARGE_CONTEXT_MODEL if its context window is larger than `model`'s.
+    """
+    window = constants.MODEL_CONTEXT_WINDOWS.get(model)
+    large_window = constants.MODEL_CONTEXT_WINDOWS.get(constants.LARGE_CONTEXT_MODEL)
+    if window is None or large_window is None or large_window <= window:
+        return None
+    return constants.LARGE_CONTEXT_MODEL
 
-    def _init_model(self, model: str = constants.DEFAULT_MODEL) -> ChatOpenAI:
-        return ChatOpenAI(model=model, temperature=0)
+class ModelService:
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
+
+    def _init_model(self, model: str = constants.DEFAULT_MODEL) -> "ChatOpenAI":
+        # Imported on first use (or by warmup.py): langchain_community and openai are slow to import.
+        from langchain_community.chat_models import ChatOpenAI
+        # Retries are handled by the scheduler so that 429s back off globally.
+        return ChatOpenAI(model=model, temperature=0, max_retries=0)
+
+    def _get_model(self, model: str) -> "ChatOpenAI":
+        with _models_lock:
+            if model not in _models:
+                _models[model] = self._init_model(model)
+            return _models[model]
+
+    def _route(self, stage: str, tokens: int) -> str:
+        """
+        Picks the model configured for `stage` in constants.MODEL_ROUTES, upgrading to
+        the large-context model when the prompt does not fit the routed model's window.
 
-    def _invoke_llm(self, prompt: PromptTemplate, inputs: dict) -> str:
+        Raises:
+            ContextWindowExceeded: If the prompt fits no model with a larger window either.
+        """
+        model = routed_model(stage)
+        window = constants.MODEL_CONTEXT_WINDOWS.get(model)
+        if window is None or tokens <= window:
+            return model
+        larger = larger_context_model(model)
+        if larger is None or tokens > constants.MODEL_CONTEXT_WINDOWS[larger]:
+            raise ContextWindowExceeded(f"{stage}: {tokens} tokens exceed the {model} context window.")
+        print(f"{stage}: {tokens} tokens exceed the {model} context window, using {larger}")
+        return larger
+
+    def _call_routed(self, stage: str, invoke: Callable[["ChatOpenAI"], str], tokens: int,
+                     priority: int, deadline: Optional[float] = None) -> str:
+        """
+        Runs `invoke` with the model routed for `stage`, retrying once with the fallback
+        model if the call fails with a connection error, a timeout or a 5xx, or with a
+        larger-context model if the prompt overflows the model's context.
+        """
+        model = self._route(stage, tokens)
+        try:
+            return self._call_model(stage, model, invoke, tokens, priority, deadline)
+        except Exception as e:
+            import openai  # already loaded by the failed call
+            if isinstance(e, openai.BadRequestError) and e.code == "context_length_exceeded":
+                fallback = larger_context_model(model)
+            elif isinstance(e, (openai.APIConnectionError, openai.InternalServerError)):
+                # Only transient failures: bad requests, auth or quota errors would fail again.
+                fallback = constants.FALLBACK_MODEL
+            else:
+                raise
+            if fallback is None or fallback == model:
+                raise
+            print(f"{stage}: {model} failed ({e}), falling back to {fallback}")
+            return self._call_model(stage, fallback, invoke, tokens, priority, deadline)
+
+    def _call_model(self, stage: str, model: str, invoke: Callable[["ChatOpenAI"], str], tokens: int,
+                    priority: int, deadline: Optional[float]) -> str:
+        llm = self._get_model(model)
+
+        def request() -> str:
+            with scheduler.request_slot():
+                return invoke(llm)
+
+        # Hedge the admitted request only: time spent queued or backing off from 429s must
+        # neither count as latency nor trigger a hedge, and a hedge needs capacity of its own.
+        return scheduler.run(lambda: hedger.call(
+            stage, request, deadline, admit_hedge=lambda: scheduler.try_acquire(tokens)
+        ), tokens, priority, self.session_id, deadline)
+
+    def _invoke_llm(self, prompt: PromptTemplate, inputs: dict, stage: str,
+                    priority: int = PRIORITY_BACKGROUND, deadline: Optional[float] = None) -> str:
         formatted_prompt = prompt.format(**inputs)
-        print("Prompt Length:", count_tokens(formatted_prompt))
-        return (prompt | self.llm).invoke(inputs).content
+        model = routed_model(stage)
+        prompt_tokens = count_tokens(formatted_prompt, model)
+        print("Prompt Length:", prompt_tokens)
+        output = self._call_routed(stage, lambda llm: (prompt | llm).invoke(inputs).content,
+                                   prompt_tokens + constants.EXPECTED_COMPLETION_TOKENS,
+                                   priority, deadline)
+        token_usage.record(self.session_id, prompt_tokens, count_tokens(output, model))
+        return output
 
     def extract_project_description(self, task_description: str) -> str:
         template = """
@@ -36,7 +175,8 @@ class ModelService:
             input_variables=["task_description"],
             template=template,
         )
-        return self._invoke_llm(prompt, {"task_description": task_description})
+        return self._invoke_llm(prompt, {"task_description": task_description},
+                                stage="extract_project_description")
 
     def restructure_requirements(self, requirements: str) -> str:
         template = """
@@ -68,9 +208,10 @@ class ModelService:
             input_variables=["requirements"],
             template=template.strip()
         )
-        return self._invoke_llm(prompt, {"requirements": requirements})
+        return self._invoke_llm(prompt, {"requirements": requirements}, stage="restructure_requirements")
 
-    def summarize_file(self, file_path: str, file_content: str, project_description: str) -> str:
+    def summarize_file(self, file_path: str, file_content: str, project_description: str,
+                       deadline: Optional[float] = None) -> str:
         template = """
                     You are reviewing a file from a student project. 
                     Your task is to summarize what this file contains and explain its role in the project.
@@ -101,10 +242,11 @@ class ModelService:
             "project_description": project_description,
             "file_path": file_path,
             "file_content": file_content
-        })
+        }, stage="summarize_file", deadline=deadline)
 
     def analyze_file_quality(self, file_path: str, file_summary: str,
-                             file_content: str, structured_requirements: str) -> str:
+                             file_content: str, structured_requirements: str,
+                             deadline: Optional[float] = None) -> str:
         prompt = """
                 You are reviewing a file from a student project. You are given:
                 - A short summary describing the purpose of the file
@@ -153,7 +295,7 @@ class ModelService:
             "file_path": file_path,
             "file_summary": file_summary,
             "file_content": file_content
-        })
+        }, stage="analyze_file_quality", deadline=deadline)
 
     def generate_final_feedback(self, file_feedbacks: str, requirements: str, project_description: str) -> str:
         template = """
@@ -219,7 +361,7 @@ class ModelService:
             "file_feedbacks": file_feedbacks,
             "requirements": requirements,
             "project_description": project_description
-        })
+        }, stage="generate_final_feedback")
 
     def get_relevant_files(self, file_data: list[dict], query: str) -> list[str]:
         """
@@ -266,7 +408,7 @@ class ModelService:
         output = self._invoke_llm(prompt, {
             "file_summary": file_summary,
             "query": query
-        }).strip()
+        }, stage="get_relevant_files", priority=PRIORITY_INTERACTIVE).strip()
 
         return output.split() if output else []
 
@@ -292,9 +434,16 @@ class ModelService:
                     {relevant_file_data}
                     """)
 
-        print("System Message Tokens:", count_tokens(system_message.content))
-        print("Conversation Tokens:", sum(count_tokens(msg.content) for msg in previous_conversation))
+        model = routed_model("generate_response")
+        system_tokens = count_tokens(system_message.content, model)
+        conversation_tokens = sum(count_tokens(msg.content, model) for msg in previous_conversation)
+        print("System Message Tokens:", system_tokens)
+        print("Conversation Tokens:", conversation_tokens)
 
         messages = [system_message] + previous_conversation
-        return self.llm(messages).content
+        output = self._call_routed("generate_response", lambda llm: llm(messages).content,
+                                   system_tokens + conversation_tokens + constants.EXPECTED_COMPLETION_TOKENS,
+                                   PRIORITY_INTERACTIVE)
+        token_usage.record(self.session_id, system_tokens + conversation_tokens, count_tokens(output, model))
+        return output
 
@@ -1,33 +1,38 @@
 from model_service import ModelService
+from llm_scheduler import DeadlineExceeded, RateLimitExceeded
+import constants
 import json
 import os
+import time
 from pathlib import Path
-import nbformat
-from typing import List, Dict, Tuple, Union
+from typing import List, Dict, Tuple, Union, Optional
 VALID_EXTENSIONS = {'.py', '.ipynb', '.md', '.txt', '.sql'}
+NOT_ANALYZED = "Not analyzed: the review ran out of time for this file."
 
 def analyze_project(project_folder: Union[str, Path], requirements: str,
-                    description: str) -> Tuple[str, List[Dict[str, str]]]:
+                    description: str, session_id: Optional[str] = None) -> Tuple[str, List[Dict[str, str]]]:
     """
     Analyzes the uploaded project directory by summarizing files, structuring requirements,
     and generating quality feedback using an LLM-based service.
+    Files not summarized or not analyzed before their stage deadline get NOT_ANALYZED as feedback.
 
     Args:
         project_folder (Union[str, Path]): Path to the extracted project folder.
         requirements (str): Raw textual requirements provided by the user.
         description (str): High-level project description.
+        session_id (Optional[str]): Session the LLM calls are scheduled under.
 
     Returns:
         Tuple[str, List[Dict[str, str]]]: Final feedback string and list of file data dicts
-        with keys: 'path', 'code', and 'summary'.
+        with keys: 'path', 'code', 'summary' and 'feedback'.
     """
     print("Analyzing files in ", project_folder)
-    file_data = get_all_project_files(project_folder, description)
+    file_data = get_all_project_files(project_folder, description, session_id)
     file_summary = [{"summary": file["summary"], "path": file["path"]} for file in file_data]
     print("Summary of files")
     print(file_summary)
 
-    model_service = ModelService()
+    model_service = ModelService(session_id)
     structured_requirements = model_service.restructure_requirements(requirements)
     try:
         structured_requirements = json.loads(structured_requirements)
@@ -39,32 +44,49 @@ def analyze_project(project_folder: Union[str, Path], requirements: str,
 
 
     file_feedbacks = {}
+    deadline = time.monotonic() + constants.ANALYSIS_STAGE_TIMEOUT_SECONDS
     for file in file_data:
         path = file["path"]
         content = file["code"]
         summary = file["summary"]
-        file_feedback = model_service.analyze_file_quality(path, summary, content, structured_requirements)
+        if summary == NOT_ANALYZED:
+            file["feedback"] = file_feedbacks[path] = NOT_ANALYZED
+            continue
+        try:
+            file_feedback = model_service.analyze_file_quality(path, summary, content, structured_requirements,
+                                                               deadline=deadline)
+        except DeadlineExceeded:
+            print(f"Analysis deadline reached, {path} was not analyzed.")
+            file_feedback = NOT_ANALYZED
         print(f"Feedback for {path}:")
         print(file_feedback)
         file_feedbacks[path] = file_feedback
+        file["feedback"] = file_feedback
 
     final_feedback = model_service.generate_final_feedback(file_feedbacks, structured_requirements, description)
     return final_feedback, file_data
 
-def get_all_project_files(folder_path: Union[str, Path], project_description: str) -> List[Dict[str, str]]:
+def get_all_project_files(folder_path: Union[str, Path], project_description: str,
+                          session_id: Optional[str] = None) -> List[Dict[str, str]]:
     """
     Recursively traverses a project directory and summarizes each file using an LLM.
+    Files that cannot be summarized before the stage deadline get NOT_ANALYZED as summary.
 
     Args:
         folder_path (Union[str, Path]): Path to the root folder of the project.
         project_description (str): Description of the project for contextual summarization.
+        session_id (Optional[str]): Session the LLM calls are scheduled under.
 
     Returns:
         List[Dict[str, str]]: List of file info dictionaries with keys:
                               'path' (str), 'code' (str), and 'summary' (str).
+
+    Raises:
+        RateLimitExceeded: If OpenAI keeps rejecting the calls with 429 after all retries.
     """
     file_data = []
-    model_service = ModelService()
+    model_service = ModelService(session_id)
+    deadline = time.monotonic() + constants.SUMMARY_STAGE_TIMEOUT_SECONDS
     print("Collecting files from the project directory...")
     for root, _, files in os.walk(folder_path):
         print(f"Processing directory: {root}")
@@ -83,12 +105,20 @@ def get_all_project_files(folder_path: Union[str, Path], project_description: st
                     with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                         content = f.read()
                 relative_path = os.path.relpath(file_path, folder_path)
-                summary = model_service.summarize_file(relative_path, content, project_description)
+                try:
+                    summary = model_service.summarize_file(relative_path, content, project_description,
+                                                           deadline=deadline)
+                except DeadlineExceeded:
+                    print(f"Summary deadline reached, {relative_path} was not summarized.")
+                    summary = NOT_ANALYZED
                 file_data.append({
                     "path": relative_path,
                     "code": content,
                     "summary": summary
                 })
+            except RateLimitExceeded:
+                # The remaining files would hit the same limit: let the caller answer 429.
+                raise
             except Exception as e:
                 print(f"Skipped {file_path}: {e}")
                 continue
@@ -109,6 +139,8 @@ def clean_notebook_outputs(path: Union[str, Path]) -> str:
         nbformat.reader.NotJSONError: If the file is not a valid Jupyter Notebook.
         Exception: For other unexpected errors during processing.
     """
+    import nbformat  # slow to import, only needed for notebooks
+
     try:
         with open(path, 'r', encoding='utf-8') as f:
             nb = nbformat.read(f, as_version=4)
@@ -128,7 +160,8 @@ def clean_notebook_outputs(path: Union[str, Path]) -> str:
         raise RuntimeError(f"Error processing notebook: {e}") from e
 
 def process_follow_up_message(chat_history: List[Dict[str, str]],
-                              user_query: str, file_data: List[Dict[str, str]]) -> str:
+                              user_query: str, file_data: List[Dict[str, str]],
+                              session_id: Optional[str] = None) -> str:
     """
     Processes a follow-up question by finding relevant files and generating a response.
 
@@ -136,11 +169,12 @@ def process_follow_up_message(chat_history: List[Dict[str, str]],
         chat_history (List[Dict[str, str]]): Conversation history between user and system.
         user_query (str): User's current message or question.
         file_data (List[Dict[str, str]]): List of files with their code and paths.
+        session_id (Optional[str]): Session the LLM calls are scheduled under.
 
     Returns:
         str: Model-generated response based on relevant files and chat history.
     """
-    model_service = ModelService()
+    model_service = ModelService(session_id)
     relevant_files = model_service.get_relevant_files(file_data, user_query)
     print(f"Relevant files: {relevant_files}")
     relevant_file_data = [{file["path"]: file["code"]} for file in file_data if file["path"] in relevant_files]
@@ -1,20 +1,27 @@
 from project_analyzer import analyze_project, process_follow_up_message
-from repository_extraction import clean_zip_file
+from repository_extraction import clean_zip_file, parse_github_url, resolve_commit_sha
+from single_flight import single_flight
 from langchain_core.messages import HumanMessage, AIMessage
+from typing import Optional
+import threading
 
 class ProjectReviewer:
     """
     A class that manages the lifecycle of reviewing a project using LLM-based analysis.
     """
-    def __init__(self, repo: str):
+    def __init__(self, repo: str, session_id: Optional[str] = None):
         """
         Initializes the ProjectReviewer with a ZIP archive of the project.
 
         Args:
             repo (str): The url of GitHub link to the project.
+            session_id (Optional[str]): The chat session this review belongs to.
         """
         self.project_repo = repo
+        self.session_id = session_id
+        self.commit_sha = None
         self.chat_history = []
+        self._chat_lock = threading.Lock()
         self.project_description = None
         self.project_requirements = None
         self.project_directory = None
@@ -24,7 +31,7 @@ class ProjectReviewer:
         """
         Extracts and parses the contents of the uploaded ZIP file.
         """
-        project_data = clean_zip_file(self.project_repo)
+        project_data = clean_zip_file(self.project_repo, self.session_id, self.commit_sha or "main")
         self.project_requirements = project_data["requirements"]
         self.project_description = project_data["description"]
         self.project_directory = project_data["project_directory"]
@@ -37,11 +44,50 @@ class ProjectReviewer:
             str: Feedback message generated by the AI based on the project.
         """
         feedback, self.file_data = analyze_project(self.project_directory, self.project_requirements,
-                                                   self.project_description)
+                                                   self.project_description, self.session_id)
         ai_message = AIMessage(content=feedback)
         self.chat_history.append(ai_message)
         return ai_message.content
 
+    def review(self) -> str:
+        """
+        Extracts and analyzes the project at the current commit of its main branch.
+        Concurrent reviews of the same commit, in this or another worker, share one analysis.
+
+        Returns:
+            str: Feedback message generated by the AI based on the project.
+        """
+        owner, repo_name = parse_github_url(self.project_repo)
+        self.commit_sha = resolve_commit_sha(self.project_repo)
+        state = single_flight.do(f"{owner}/{repo_name}@{self.commit_sha}", self.analyze_commit)
+        self.project_requirements = state["requirements"]
+        self.project_description = state["description"]
+        self.file_data = state["file_data"]
+        ai_message = AIMessage(content=state["feedback"])
+        self.chat_history.append(ai_message)
+        return ai_message.content
+
+    def analyze_commit(self) -> dict:
+        """
+        Extracts and analyzes the project at `commit_sha`, resolving the current commit of the
+        main branch first if it is not set. Unlike review(), never shares the work with
+        concurrent reviews.
+
+        Returns:
+            dict: The review state: 'requirements', 'description', 'file_data' and 'feedback'.
+        """
+        if self.commit_sha is None:
+            self.commit_sha = resolve_commit_sha(self.project_repo)
+        self.extract_files()
+        feedback, file_data = analyze_project(self.project_directory, self.project_requirements,
+                                              self.project_description, self.session_id)
+        return {
+            "requirements": self.project_requirements,
+            "description": self.project_description,
+            "file_data": file_data,
+            "feedback": feedback,
+        }
+
     def ask_followup(self, user_input: str) -> str:
         """
         Handles a user’s follow-up question using previously analyzed files.
@@ -55,10 +101,17 @@ class ProjectReviewer:
         Raises:
             RuntimeError: If LLM processing fails.
         """
-        human_reply = HumanMessage(content=user_input)
-        self.chat_history.append(human_reply)
-        response = process_follow_up_message(self.chat_history, user_input, self.file_data)
-        ai_reply = AIMessage(content=response)
-        self.chat_history.append(ai_reply)
-        return ai_reply.content
+        # Messages of one session are answered in order, so the history stays consistent.
+        with self._chat_lock:
+            human_reply = HumanMessage(content=user_input)
+            self.chat_history.append(human_reply)
+            try:
+                response = process_follow_up_message(self.chat_history, user_input, self.file_data,
+                                                     self.session_id)
+            except Exception:
+                self.chat_history.pop()
+                raise
+            ai_reply = AIMessage(content=response)
+            self.chat_history.append(ai_reply)
+            return ai_reply.content
 
@@ -6,6 +6,7 @@ import os
 import re
 from typing import Optional, Tuple
 from model_service import ModelService
+import constants
 import tempfile
 import shutil
 import dotenv
@@ -13,7 +14,7 @@ from urllib.parse import urlparse
 
 dotenv.load_dotenv()
 
-def clean_zip_file(repo: str) -> dict:
+def clean_zip_file(repo: str, session_id: Optional[str] = None, ref: str = "main") -> dict:
     """
     Processes a GitHub repository by downloading, extracting, and analyzing its contents to extract:
     - Task requirements (from a structured `.ipynb` or `.md` file. Turing College task descriptions
@@ -23,6 +24,8 @@ def clean_zip_file(repo: str) -> dict:
 
     Args:
         repo (str): The URL of the GitHub repository (e.g., "https://github.com/user/repo").
+        session_id (Optional[str]): Session the LLM calls are scheduled under.
+        ref (str, optional): The branch or commit SHA to download. Defaults to "main".
 
     Returns:
         dict: A dictionary containing the following keys:
@@ -31,8 +34,8 @@ def clean_zip_file(repo: str) -> dict:
             - "project_directory" (str): Path to the extracted project folder.
     """
     project_data = {}
-    model_service = ModelService()
-    zip_file = download_repo(repo)
+    model_service = ModelService(session_id)
+    zip_file = download_repo(repo, ref)
     project_folder = extract_zip(zip_file)
     task_description = extract_task_description(project_folder)
     requirements = extract_requirements(task_description)
@@ -57,16 +60,11 @@ def download_repo(repo_url: str, branch: str = "main") -> Optional[io.BytesIO]:
     Raises:
         requests.exceptions.RequestException: If the request fails (e.g., connection error).
     """
-    token = os.getenv("GITHUB_TOKEN", None)
     owner, repo_name = parse_github_url(repo_url)
-
-    headers = {"Accept": "application/vnd.github+json", 
-               "X-GitHub-Api-Version": "2022-11-28"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+    headers = github_headers()
     try:
         # Construct the correct URL for the ZIP file
-        url = f"https://api.github.com/repos/{owner}/{repo_name}/zipball/{branch}"
+        url = f"{constants.GITHUB_API_URL}/repos/{owner}/{repo_name}/zipball/{branch}"
 
         # Send a GET request to download the ZIP file
         response = requests.get(url, headers=headers)
@@ -75,6 +73,39 @@ def download_repo(repo_url: str, branch: str = "main") -> Optional[io.BytesIO]:
     except requests.exceptions.RequestException as e:
         raise e
 
+def resolve_commit_sha(repo_url: str, branch: str = "main") -> str:
+    """
+    Resolve the commit SHA a branch of a GitHub repository currently points to.
+
+    Args:
+        repo_url (str): The URL of the GitHub repository (e.g., "https://github.com/user/repo").
+        branch (str, optional): The branch to resolve. Defaults to "main".
+
+    Returns:
+        str: The full commit SHA.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails (e.g., connection error).
+    """
+    owner, repo_name = parse_github_url(repo_url)
+    headers = github_headers()
+    headers["Accept"] = "application/vnd.github.sha"
+    url = f"{constants.GITHUB_API_URL}/repos/{owner}/{repo_name}/commits/{branch}"
+    response = requests.get(url, headers=headers)
+    response.raise_for_status()
+    return response.text.strip()
+
+def github_headers() -> dict:
+    """
+    Build the GitHub API request headers, authenticated if GITHUB_TOKEN is set.
+    """
+    token = os.getenv("GITHUB_TOKEN", None)
+    headers = {"Accept": "application/vnd.github+json",
+               "X-GitHub-Api-Version": "2022-11-28"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
 def parse_github_url(repo_url: str) -> Tuple[str, str]:
     """
     Parse a GitHub repository URL to extract owner and repository name.
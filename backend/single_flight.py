@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import constants
+from llm_scheduler import RateLimitExceeded
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent executions of the same work, keyed by a string.
+
+    Within a process, later callers wait on the leader's thread. Across processes (e.g.
+    gunicorn workers), the leader holds a lease row in a local SQLite database and stores
+    its JSON-serializable result there; callers in other workers poll the row and reuse the
+    result. The leader renews its lease while `fn` runs, so a lease only expires if its holder
+    died; it is then taken over by the next caller. A finished result stays reusable for
+    `result_ttl` seconds.
+    """
+    def __init__(self, db_path: str, lease_seconds: float = constants.SINGLE_FLIGHT_LEASE_SECONDS,
+                 result_ttl: float = constants.SINGLE_FLIGHT_RESULT_TTL_SECONDS,
+                 poll_interval: float = constants.SINGLE_FLIGHT_POLL_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS flights (
+                    key TEXT PRIMARY KEY,
+                    token TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    lease_expires REAL NOT NULL,
+                    finished_at REAL,
+                    result TEXT
+                )
+            """)
+
+    def do(self, key: str, fn: Callable[[], dict]) -> dict:
+        """
+        Returns the result of `fn`, running it only if no other caller is already running it
+        for `key` (or finished it less than `result_ttl` seconds ago).
+
+        Args:
+            key (str): Identifies the work, e.g. "owner/repo@sha".
+            fn (Callable[[], dict]): Produces a JSON-serializable result.
+
+        Returns:
+            dict: The result produced by whichever caller ran `fn`.
+
+        Raises:
+            RateLimitExceeded: If the caller that ran `fn` in another process was rate limited.
+            RuntimeError: If the caller that ran `fn` in another process failed otherwise.
+            Exception: Whatever `fn` raised, if it was run by this process.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            print(f"Joining in-flight analysis of {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.done.set()
+            with self._lock:
+                del self._calls[key]
+
+    def _do_shared(self, key: str, fn: Callable[[], dict]) -> dict:
+        token = uuid.uuid4().hex
+        waiting_on = None
+        while True:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT token, status, lease_expires, finished_at, result FROM flights WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                now = time.time()
+                if row is not None:
+                    row_token, status, lease_expires, finished_at, result = row
+                    if status == "done" and now - finished_at < self.result_ttl:
+                        print(f"Reusing analysis of {key} from another worker")
+                        return json.loads(result)
+                    if status == "running" and lease_expires > now:
+                        if waiting_on is None:
+                            print(f"Waiting for another worker analyzing {key}")
+                        waiting_on = row_token
+                        conn.execute("COMMIT")
+                        time.sleep(self.poll_interval)
+                        continue
+                    if status == "failed" and row_token == waiting_on:
+                        conn.execute("COMMIT")
+                        raise _remote_error(key, result, now - finished_at)
+                conn.execute(
+                    "DELETE FROM flights WHERE status != 'running' AND finished_at < ?",
+                    (now - self.result_ttl,),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO flights (key, token, status, lease_expires) VALUES (?, ?, 'running', ?)",
+                    (key, token, now + self.lease_seconds),
+                )
+                conn.execute("COMMIT")
+            break
+
+        stop_renewing = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(key, token, stop_renewing),
+                                   name=f"lease-{key}", daemon=True)
+        renewer.start()
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(key, token, "failed", _describe_error(e))
+            raise
+        finally:
+            stop_renewing.set()
+            renewer.join()
+        self._finish(key, token, "done", json.dumps(result))
+        return result
+
+    def _renew_lease(self, key: str, token: str, stop: threading.Event) -> None:
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE flights SET lease_expires = ? WHERE key = ? AND token = ? AND status = 'running'",
+                        (time.time() + self.lease_seconds, key, token),
+                    )
+            except sqlite3.Error as e:
+                print(f"Could not renew the lease of {key}: {e}")
+
+    def _finish(self, key: str, token: str, status: str, result: Optional[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE flights SET status = ?, finished_at = ?, result = ? WHERE key = ? AND token = ?",
+                (status, time.time(), result, key, token),
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return _closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None))
+
+
+def _describe_error(error: Exception) -> str:
+    description = {"type": type(error).__name__, "message": str(error)}
+    if isinstance(error, RateLimitExceeded):
+        description["retry_after"] = error.retry_after
+    return json.dumps(description)
+
+
+def _remote_error(key: str, description: Optional[str], age: float) -> Exception:
+    """
+    Rebuilds the error of a caller in another process from its description, so that a rate
+    limit is still answered with 429 (and the rest of its Retry-After) to the followers.
+    """
+    try:
+        description = json.loads(description)
+    except (TypeError, ValueError):
+        description = {"message": description}
+    message = description.get("message") or f"Analysis of {key} failed in another worker."
+    if description.get("type") == RateLimitExceeded.__name__:
+        return RateLimitExceeded(message, retry_after=max(0.0, description["retry_after"] - age))
+    return RuntimeError(message)
+
+
+class _closing:
+    """
+    Context manager closing the connection on exit (sqlite3's own only ends transactions).
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, *exc_info) -> None:
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+
+single_flight = SingleFlight(constants.SINGLE_FLIGHT_DB)
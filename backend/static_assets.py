@@ -0,0 +1,75 @@
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from flask import Request, Response, send_file
+
+# Vite emits content-hashed bundles into assets/, e.g. assets/index-4f3a2b1c.js.
+HASHED_ASSET = re.compile(r"^assets/.+[.-][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Precompressed variants written next to each file at build time (see Dockerfile),
+# in order of preference.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticAsset:
+    def __init__(self, relative_path: str, full_path: str):
+        self.path = full_path
+        self.mimetype = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+        self.cache_control = IMMUTABLE if HASHED_ASSET.match(relative_path) else REVALIDATE
+        with open(full_path, "rb") as f:
+            self.digest = hashlib.sha256(f.read()).hexdigest()[:32]
+        self.variants = {
+            encoding: full_path + suffix
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(full_path + suffix)
+        }
+
+
+class StaticAssets:
+    """
+    Serves the built frontend from an index of its files built once at startup.
+
+    Content-hashed bundles are cached by browsers forever, everything else (index.html
+    included) is revalidated on every load with its ETag and answered with 304 when it
+    did not change. Precompressed brotli/gzip variants are sent to clients accepting them.
+    """
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.assets: Dict[str, StaticAsset] = {}
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                full_path = os.path.join(root, name)
+                relative_path = os.path.relpath(full_path, folder).replace(os.sep, "/")
+                self.assets[relative_path] = StaticAsset(relative_path, full_path)
+
+    def response(self, path: str, request: Request) -> Optional[Response]:
+        """
+        Builds the response for the asset at `path`, or returns None if there is no such asset.
+        """
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+
+        encoding = next(
+            (encoding for encoding, _ in ENCODINGS
+             if encoding in asset.variants and request.accept_encodings[encoding]),
+            None,
+        )
+        file_path = asset.variants[encoding] if encoding else asset.path
+        etag = f"{asset.digest}-{encoding}" if encoding else asset.digest
+
+        # Name the decoded file, not the .br/.gz variant actually sent.
+        response = send_file(file_path, mimetype=asset.mimetype, etag=etag, conditional=True,
+                             download_name=os.path.basename(asset.path))
+        response.headers["Cache-Control"] = asset.cache_control
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        if encoding and response.status_code != 304:
+            response.headers["Content-Encoding"] = encoding
+        return response
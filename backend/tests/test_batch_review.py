@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import batch_review
+from batch_review import read_checkpoint, read_repo_urls, run_batch
+
+
+def fake_review(repo_url):
+    if "broken" in repo_url:
+        return {"repo_url": repo_url, "status": "failed", "error": "HTTPError: 404"}
+    return {"repo_url": repo_url, "status": "ok", "review": "Good", "files": [],
+            "tokens": {"prompt_tokens": 10, "completion_tokens": 2}}
+
+
+def fake_init_worker(*args):
+    pass
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def reviewed_after_line(output, line_count):
+    with open(output, encoding="utf-8") as f:
+        lines = f.readlines()[line_count:]
+    return [json.loads(line)["repo_url"] for line in lines]
+
+
+def test_csv_with_url_column(tmp_path):
+    path = write_lines(tmp_path / "cohort.csv", [
+        "student,repoUrl",
+        "ana,https://github.com/ana/project",
+        "ben,https://github.com/ben/project",
+        "ana again,https://github.com/ana/project",
+        "carl,",
+    ])
+    assert read_repo_urls(path) == ["https://github.com/ana/project", "https://github.com/ben/project"]
+
+
+def test_csv_without_header_uses_the_first_column(tmp_path):
+    path = write_lines(tmp_path / "cohort.csv", [
+        "https://github.com/ana/project,ana",
+        " https://github.com/ben/project ,ben",
+    ])
+    assert read_repo_urls(path) == ["https://github.com/ana/project", "https://github.com/ben/project"]
+
+
+def test_jsonl_with_any_url_key(tmp_path):
+    path = write_lines(tmp_path / "cohort.jsonl", [
+        json.dumps({"repo_url": "https://github.com/ana/project"}),
+        "",
+        json.dumps({"repoUrl": "https://github.com/ben/project"}),
+        json.dumps({"url": "https://github.com/ana/project"}),
+        json.dumps({"student": "carl"}),
+    ])
+    assert read_repo_urls(path) == ["https://github.com/ana/project", "https://github.com/ben/project"]
+
+
+def test_checkpoint_keeps_the_last_record_and_ignores_other_lines(tmp_path):
+    path = write_lines(tmp_path / "reviews.jsonl", [
+        json.dumps({"repo_url": "https://github.com/ana/project", "status": "failed"}),
+        json.dumps({"something": "else"}),
+        json.dumps({"repo_url": "https://github.com/ben/project"}),
+        json.dumps(["not", "a", "record"]),
+        json.dumps({"repo_url": "https://github.com/ana/project", "status": "ok"}),
+        '{"repo_url": "https://github.com/carl/project", "sta',
+    ])
+    assert read_checkpoint(path) == {
+        "https://github.com/ana/project": {"repo_url": "https://github.com/ana/project", "status": "ok"},
+    }
+
+
+def test_missing_checkpoint(tmp_path):
+    assert read_checkpoint(str(tmp_path / "reviews.jsonl")) == {}
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    monkeypatch.setattr(batch_review, "review_repo", fake_review)
+    monkeypatch.setattr(batch_review, "init_worker", fake_init_worker)
+
+
+def test_resume_skips_ok_repositories_and_retries_failures(tmp_path, fake_pool):
+    output = tmp_path / "reviews.jsonl"
+    # Crashed while writing the third record.
+    output.write_text(json.dumps({"repo_url": "https://github.com/ana/project", "status": "ok"}) + "\n"
+                      + json.dumps({"repo_url": "https://github.com/ben/project", "status": "failed"}) + "\n"
+                      + '{"repo_url": "https://github.com/carl/pro', encoding="utf-8")
+    output = str(output)
+    urls = ["https://github.com/ana/project", "https://github.com/ben/project",
+            "https://github.com/carl/project", "https://github.com/dan/broken"]
+
+    summary = run_batch(urls, output, processes=2, llm_concurrency=2, stage_timeout=60)
+
+    assert sorted(reviewed_after_line(output, 3)) == urls[1:]
+    assert summary["total"] == 4
+    assert summary["ok"] == 3
+    assert summary["failures"] == [{"repo_url": "https://github.com/dan/broken", "error": "HTTPError: 404"}]
+
+    run_batch(urls, output, processes=2, llm_concurrency=2, stage_timeout=60)
+    # Only the failure is retried.
+    assert reviewed_after_line(output, 6) == ["https://github.com/dan/broken"]
+
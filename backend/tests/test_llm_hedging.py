@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_hedging import Hedger, LatencyTracker, percentile
+from llm_scheduler import DeadlineExceeded, LLMScheduler
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        yield executor
+
+
+def make_hedger(executor, samples=(0.05,) * 20, budget_ratio=1.0):
+    tracker = LatencyTracker()
+    for seconds in samples:
+        tracker.record_primary("stage", seconds)
+    return Hedger(tracker, executor, enabled=True, hedge_percentile=95, min_samples=20,
+                  budget_ratio=budget_ratio)
+
+
+def slow_then_fast():
+    """
+    A request that takes 1s the first time and 10 ms afterwards, returning which attempt won.
+    """
+    attempts = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            attempts.append(1)
+            attempt = len(attempts)
+        time.sleep(1.0 if attempt == 1 else 0.01)
+        return attempt
+
+    return fn, attempts
+
+
+@pytest.mark.parametrize("samples, q, expected", [
+    (range(1, 31), 95, 29),
+    (range(1, 21), 95, 19),
+    (range(1, 101), 50, 50),
+    (range(1, 101), 99, 99),
+    ([7], 99, 7),
+    ([], 50, None),
+])
+def test_percentile_is_nearest_rank(samples, q, expected):
+    assert percentile(list(samples), q) == expected
+
+
+def test_slow_request_is_hedged_and_hedge_wins(executor):
+    hedger = make_hedger(executor)
+    fn, attempts = slow_then_fast()
+    start = time.monotonic()
+    assert hedger.call("stage", fn) == 2
+    assert time.monotonic() - start < 0.5
+    stats = hedger.tracker.snapshot()["stage"]
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_no_hedge_before_enough_samples(executor):
+    hedger = make_hedger(executor, samples=(0.05,) * 5)
+    fn, attempts = slow_then_fast()
+    assert hedger.call("stage", fn) == 1
+    assert len(attempts) == 1
+
+
+def test_no_hedge_when_not_admitted(executor):
+    hedger = make_hedger(executor)
+    fn, attempts = slow_then_fast()
+    assert hedger.call("stage", fn, admit_hedge=lambda: False) == 1
+    assert len(attempts) == 1
+    assert hedger.tracker.snapshot()["stage"]["hedges"] == 0
+
+
+def test_no_hedge_while_scheduler_is_paused(executor):
+    scheduler = LLMScheduler(600000, 10 ** 9)
+    scheduler._pause(60)
+    hedger = make_hedger(executor)
+    fn, attempts = slow_then_fast()
+    assert hedger.call("stage", fn, admit_hedge=lambda: scheduler.try_acquire(100)) == 1
+    assert len(attempts) == 1
+
+
+def test_hedges_are_limited_by_budget(executor):
+    hedger = make_hedger(executor, budget_ratio=0.2)
+    for counter in ("calls", "calls", "calls", "calls", "hedges"):
+        hedger.tracker.increment("other", counter)
+    fn, attempts = slow_then_fast()
+    # With this call, 1 hedge for 5 calls already uses the whole budget.
+    assert hedger.call("stage", fn) == 1
+    assert len(attempts) == 1
+
+
+def test_deadline_exceeded(executor):
+    hedger = make_hedger(executor, samples=())
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        hedger.call("stage", lambda: time.sleep(1), deadline=start + 0.1)
+    assert time.monotonic() - start < 0.5
+    assert hedger.tracker.snapshot()["stage"]["deadline_misses"] == 1
+
+
+def test_error_is_raised_when_every_request_fails(executor):
+    hedger = make_hedger(executor, samples=())
+
+    def fn():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        hedger.call("stage", fn)
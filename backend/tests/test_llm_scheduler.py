@@ -0,0 +1,176 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import openai
+import pytest
+
+from llm_scheduler import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, DeadlineExceeded, LLMScheduler,
+                           RateLimitExceeded, TokenBucket, _retry_after_seconds)
+
+
+def rate_limit_error(headers=None):
+    response = httpx.Response(429, headers=headers or {},
+                              request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return LLMScheduler(requests_per_minute=600000, tokens_per_minute=10 ** 9, **kwargs)
+
+
+def run_queued(scheduler, calls):
+    """
+    Queues `calls` (label, cost, priority, session) while admission is paused, in order,
+    then lets them through one at a time and returns the labels in admission order.
+    """
+    admitted = []
+    lock = threading.Lock()
+
+    def record(label):
+        with lock:
+            admitted.append(label)
+
+    scheduler._pause(60)
+    threads = []
+    for label, cost, priority, session in calls:
+        thread = threading.Thread(target=scheduler.run,
+                                  args=(lambda label=label: record(label), cost, priority, session))
+        thread.start()
+        threads.append(thread)
+        while len(scheduler._waiters) < len(threads):
+            time.sleep(0.001)
+    # One request every 20 ms, so each admitted call is recorded before the next one.
+    with scheduler._cond:
+        scheduler.requests = TokenBucket(3000)
+        scheduler.requests.tokens = 0
+        scheduler._paused_until = 0
+        scheduler._cond.notify_all()
+    for thread in threads:
+        thread.join(5)
+    return admitted
+
+
+def test_token_bucket_refills_continuously():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.consume(60, now)
+    assert bucket.time_until(1, now) == pytest.approx(1.0)
+    assert bucket.time_until(1, now + 1) == pytest.approx(0.0)
+    assert bucket.time_until(100, now + 1000) == pytest.approx(40.0)
+
+
+def test_interactive_calls_are_admitted_before_background_calls():
+    admitted = run_queued(make_scheduler(), [
+        ("background-1", 100, PRIORITY_BACKGROUND, "a"),
+        ("background-2", 100, PRIORITY_BACKGROUND, "b"),
+        ("interactive", 100, PRIORITY_INTERACTIVE, "c"),
+    ])
+    assert admitted == ["interactive", "background-1", "background-2"]
+
+
+def test_sessions_of_the_same_priority_share_capacity_fairly():
+    admitted = run_queued(make_scheduler(), [
+        ("a1", 100, PRIORITY_BACKGROUND, "a"),
+        ("a2", 100, PRIORITY_BACKGROUND, "a"),
+        ("a3", 100, PRIORITY_BACKGROUND, "a"),
+        ("b1", 100, PRIORITY_BACKGROUND, "b"),
+    ])
+    assert admitted == ["a1", "b1", "a2", "a3"]
+
+
+def test_deadline_reached_while_waiting_for_admission():
+    scheduler = make_scheduler()
+    scheduler._pause(60)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        scheduler.run(lambda: "never", 10, deadline=start + 0.1)
+    assert time.monotonic() - start < 1
+    assert scheduler._waiters == []
+
+
+def test_rate_limited_call_is_retried_after_retry_after_and_pauses_admission():
+    scheduler = make_scheduler()
+    attempts = []
+
+    def call():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise rate_limit_error({"retry-after-ms": "200"})
+        return "ok"
+
+    assert scheduler.run(call, 10) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+    assert scheduler._paused_until >= attempts[0] + 0.2
+
+
+def test_rate_limit_exceeded_after_all_retries():
+    scheduler = make_scheduler(max_retries=2)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise rate_limit_error()
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        scheduler.run(call, 10)
+    assert len(attempts) == 3
+    assert excinfo.value.retry_after > 0
+
+
+def test_other_errors_are_not_retried():
+    scheduler = make_scheduler()
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        scheduler.run(call, 10)
+    assert len(attempts) == 1
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "1500", "retry-after": "9"}, 1.5),
+    ({"retry-after": "2"}, 2.0),
+    ({}, None),
+    ({"retry-after": "soon"}, None),
+])
+def test_retry_after_headers(headers, expected):
+    assert _retry_after_seconds(rate_limit_error(headers)) == expected
+
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = _retry_after_seconds(rate_limit_error({"retry-after": format_datetime(retry_at, usegmt=True)}))
+    assert 28 <= seconds <= 30
+
+
+def test_try_acquire_only_admits_without_waiting():
+    scheduler = LLMScheduler(requests_per_minute=2, tokens_per_minute=10 ** 9)
+    assert scheduler.try_acquire(10)
+    scheduler._pause(60)
+    assert not scheduler.try_acquire(10)
+    scheduler._paused_until = 0
+    assert scheduler.try_acquire(10)
+    # Both requests of the minute are used.
+    assert not scheduler.try_acquire(10)
+
+
+def test_calls_missing_their_deadline_are_not_charged_to_the_session():
+    scheduler = make_scheduler()
+    scheduler._pause(60)
+    for _ in range(3):
+        with pytest.raises(DeadlineExceeded):
+            scheduler.run(lambda: "never", 100, session_id="late", deadline=time.monotonic() + 0.01)
+    assert "late" not in scheduler._session_finish
+    admitted = run_queued(scheduler, [
+        ("late", 100, PRIORITY_BACKGROUND, "late"),
+        ("other", 100, PRIORITY_BACKGROUND, "other"),
+    ])
+    # Charged for the calls it never sent, the session would be served after "other".
+    assert admitted == ["late", "other"]
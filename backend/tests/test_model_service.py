@@ -0,0 +1,117 @@
+import threading
+
+import httpx
+import openai
+import pytest
+
+import constants
+from model_service import ContextWindowExceeded, ModelService, larger_context_model
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def api_error(cls, status, code=None):
+    return cls("API error", response=httpx.Response(status, request=REQUEST),
+               body={"code": code, "message": "API error"})
+
+
+@pytest.fixture(autouse=True)
+def models(monkeypatch):
+    monkeypatch.setattr(constants, "MODEL_ROUTES", {"small": "gpt-4o-mini", "cheap": "gpt-4.1-nano"})
+    monkeypatch.setattr(constants, "DEFAULT_MODEL", "gpt-4.1-mini")
+    monkeypatch.setattr(constants, "FALLBACK_MODEL", "gpt-4.1-mini")
+    monkeypatch.setattr(constants, "LARGE_CONTEXT_MODEL", "gpt-4.1")
+    monkeypatch.setattr(constants, "MODEL_CONTEXT_WINDOWS", {
+        "gpt-4.1": 1047576, "gpt-4.1-mini": 1047576, "gpt-4.1-nano": 1047576, "gpt-4o-mini": 128000,
+    })
+
+
+def service_failing_with(error):
+    """
+    A ModelService whose first call fails with `error` and whose later calls succeed,
+    recording the model of every call.
+    """
+    service = ModelService()
+    service.models = []
+
+    def call_model(stage, model, invoke, tokens, priority, deadline):
+        service.models.append(model)
+        if len(service.models) == 1 and error is not None:
+            raise error
+        return f"answer from {model}"
+
+    service._call_model = call_model
+    return service
+
+
+def test_route_uses_the_configured_model_when_the_prompt_fits():
+    assert ModelService()._route("small", 1000) == "gpt-4o-mini"
+    assert ModelService()._route("unrouted", 1000) == "gpt-4.1-mini"
+
+
+def test_route_upgrades_to_a_larger_window():
+    assert ModelService()._route("small", 200000) == "gpt-4.1"
+
+
+def test_route_rejects_prompts_no_larger_window_fits():
+    with pytest.raises(ContextWindowExceeded):
+        ModelService()._route("cheap", 2000000)
+    with pytest.raises(ContextWindowExceeded):
+        ModelService()._route("small", 2000000)
+
+
+def test_no_larger_context_model_for_the_same_window():
+    assert larger_context_model("gpt-4o-mini") == "gpt-4.1"
+    assert larger_context_model("gpt-4.1-nano") is None
+    assert larger_context_model("unknown") is None
+
+
+@pytest.mark.parametrize("error", [
+    openai.APIConnectionError(request=REQUEST),
+    openai.APITimeoutError(request=REQUEST),
+    api_error(openai.InternalServerError, 503),
+])
+def test_transient_errors_fall_back(error):
+    service = service_failing_with(error)
+    assert service._call_routed("cheap", None, 100, 0) == "answer from gpt-4.1-mini"
+    assert service.models == ["gpt-4.1-nano", "gpt-4.1-mini"]
+
+
+@pytest.mark.parametrize("error", [
+    api_error(openai.AuthenticationError, 401),
+    api_error(openai.BadRequestError, 400),
+    api_error(openai.RateLimitError, 429, "insufficient_quota"),
+    ValueError("not an API error"),
+])
+def test_other_errors_are_raised_without_fallback(error):
+    service = service_failing_with(error)
+    with pytest.raises(type(error)):
+        service._call_routed("cheap", None, 100, 0)
+    assert service.models == ["gpt-4.1-nano"]
+
+
+def test_context_length_exceeded_upgrades_only_to_a_larger_window():
+    error = api_error(openai.BadRequestError, 400, "context_length_exceeded")
+    service = service_failing_with(error)
+    assert service._call_routed("small", None, 100, 0) == "answer from gpt-4.1"
+
+    service = service_failing_with(error)
+    with pytest.raises(openai.BadRequestError):
+        service._call_routed("cheap", None, 100, 0)
+    assert service.models == ["gpt-4.1-nano"]
+
+
+def test_every_request_holds_a_concurrency_slot(monkeypatch):
+    from llm_scheduler import scheduler
+    semaphore = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(scheduler, "_concurrency", semaphore)
+    service = ModelService()
+    monkeypatch.setattr(service, "_get_model", lambda model: "llm")
+
+    def invoke(llm):
+        # The slot is taken while the request runs.
+        assert not semaphore.acquire(blocking=False)
+        return "answer"
+
+    assert service._call_model("cheap", "gpt-4.1-nano", invoke, 100, 0, None) == "answer"
+    assert semaphore.acquire(blocking=False)
@@ -0,0 +1,38 @@
+import pytest
+
+import project_analyzer
+from llm_scheduler import DeadlineExceeded, RateLimitExceeded
+from model_service import ModelService
+
+
+@pytest.fixture
+def project(tmp_path):
+    for name in ("a.py", "b.py", "c.md"):
+        (tmp_path / name).write_text(f"# {name}\n")
+    return tmp_path
+
+
+def test_rate_limit_stops_the_summaries(project, monkeypatch):
+    calls = []
+
+    def summarize_file(self, path, content, description, deadline=None):
+        calls.append(path)
+        raise RateLimitExceeded("OpenAI rate limit exceeded", retry_after=5)
+
+    monkeypatch.setattr(ModelService, "summarize_file", summarize_file)
+    with pytest.raises(RateLimitExceeded):
+        project_analyzer.get_all_project_files(project, "A project")
+    assert len(calls) == 1
+
+
+def test_files_missing_the_summary_deadline_are_kept_as_not_analyzed(project, monkeypatch):
+    def summarize_file(self, path, content, description, deadline=None):
+        if path == "b.py":
+            raise DeadlineExceeded("too late")
+        return f"Summary of {path}"
+
+    monkeypatch.setattr(ModelService, "summarize_file", summarize_file)
+    summaries = {file["path"]: file["summary"]
+                 for file in project_analyzer.get_all_project_files(project, "A project")}
+    assert summaries == {"a.py": "Summary of a.py", "b.py": project_analyzer.NOT_ANALYZED,
+                         "c.md": "Summary of c.md"}
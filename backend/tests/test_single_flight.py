@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import RateLimitExceeded
+from single_flight import SingleFlight
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "flights.sqlite3")
+
+
+def make_flight(db_path, **kwargs):
+    kwargs.setdefault("poll_interval", 0.02)
+    return SingleFlight(db_path, **kwargs)
+
+
+class CountingWork:
+    """
+    Work that takes `seconds` and counts how many times it ran.
+    """
+    def __init__(self, seconds=0.3, error=None):
+        self.seconds = seconds
+        self.error = error
+        self.runs = 0
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.runs += 1
+        self.started.set()
+        time.sleep(self.seconds)
+        if self.error:
+            raise self.error
+        return {"feedback": "good", "run": self.runs}
+
+
+def run_in_thread(flight, key, fn):
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = flight.do(key, fn)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def test_concurrent_callers_in_one_process_share_the_leader_result(db_path):
+    flight = make_flight(db_path)
+    work = CountingWork()
+    callers = [run_in_thread(flight, "owner/repo@sha", work) for _ in range(4)]
+    for thread, _ in callers:
+        thread.join(5)
+    assert work.runs == 1
+    assert all(outcome["result"] == {"feedback": "good", "run": 1} for _, outcome in callers)
+
+
+def test_leader_failure_is_raised_to_followers_in_the_same_process(db_path):
+    flight = make_flight(db_path)
+    work = CountingWork(error=ValueError("clone failed"))
+    callers = [run_in_thread(flight, "owner/repo@sha", work) for _ in range(3)]
+    for thread, _ in callers:
+        thread.join(5)
+    assert work.runs == 1
+    assert all(isinstance(outcome["error"], ValueError) for _, outcome in callers)
+
+
+def test_follower_in_another_worker_reuses_the_result(db_path):
+    # Two instances on the same database behave like two gunicorn workers.
+    leader, follower = make_flight(db_path), make_flight(db_path)
+    work = CountingWork()
+    thread, outcome = run_in_thread(leader, "owner/repo@sha", work)
+    work.started.wait(5)
+    assert follower.do("owner/repo@sha", work) == {"feedback": "good", "run": 1}
+    thread.join(5)
+    assert outcome["result"] == {"feedback": "good", "run": 1}
+    assert work.runs == 1
+
+
+def test_finished_result_is_reused_until_it_expires(db_path):
+    work = CountingWork(seconds=0)
+    make_flight(db_path, result_ttl=0.2).do("owner/repo@sha", work)
+    make_flight(db_path, result_ttl=0.2).do("owner/repo@sha", work)
+    assert work.runs == 1
+    time.sleep(0.3)
+    make_flight(db_path, result_ttl=0.2).do("owner/repo@sha", work)
+    assert work.runs == 2
+
+
+def test_failure_in_another_worker_is_raised_to_its_followers(db_path):
+    leader, follower = make_flight(db_path), make_flight(db_path)
+    work = CountingWork(error=ValueError("clone failed"))
+    thread, _ = run_in_thread(leader, "owner/repo@sha", work)
+    work.started.wait(5)
+    with pytest.raises(RuntimeError, match="clone failed"):
+        follower.do("owner/repo@sha", work)
+    thread.join(5)
+    assert work.runs == 1
+
+
+def test_lease_of_a_dead_worker_is_taken_over(db_path):
+    flight = make_flight(db_path)
+    with flight._connect() as conn:
+        conn.execute(
+            "INSERT INTO flights (key, token, status, lease_expires) VALUES (?, 'dead', 'running', ?)",
+            ("owner/repo@sha", time.time() - 1),
+        )
+    work = CountingWork(seconds=0)
+    assert flight.do("owner/repo@sha", work) == {"feedback": "good", "run": 1}
+
+
+def test_lease_is_renewed_while_the_leader_runs(db_path):
+    leader = make_flight(db_path, lease_seconds=0.3)
+    follower = make_flight(db_path, lease_seconds=0.3)
+    # Runs for several lease lengths: without renewal the follower would take over.
+    work = CountingWork(seconds=1.0)
+    thread, outcome = run_in_thread(leader, "owner/repo@sha", work)
+    work.started.wait(5)
+    assert follower.do("owner/repo@sha", work) == {"feedback": "good", "run": 1}
+    thread.join(5)
+    assert work.runs == 1
+
+
+def test_rate_limit_in_another_worker_is_raised_as_a_rate_limit(db_path):
+    leader, follower = make_flight(db_path), make_flight(db_path)
+    work = CountingWork(error=RateLimitExceeded("OpenAI rate limit exceeded", retry_after=30))
+    thread, _ = run_in_thread(leader, "owner/repo@sha", work)
+    work.started.wait(5)
+    with pytest.raises(RateLimitExceeded, match="rate limit") as excinfo:
+        follower.do("owner/repo@sha", work)
+    thread.join(5)
+    assert 25 < excinfo.value.retry_after <= 30
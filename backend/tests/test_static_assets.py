@@ -0,0 +1,75 @@
+import gzip
+
+import pytest
+from flask import Flask, request
+
+from static_assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+BUNDLE = "assets/index-4f3a2b1c.js"
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html>app</html>")
+    bundle = b"console.log('app');" * 50
+    (tmp_path / BUNDLE).write_bytes(bundle)
+    (tmp_path / (BUNDLE + ".gz")).write_bytes(gzip.compress(bundle))
+    (tmp_path / (BUNDLE + ".br")).write_bytes(b"brotli bytes")
+
+    app = Flask(__name__)
+    assets = StaticAssets(str(tmp_path))
+
+    @app.route("/<path:path>")
+    def serve(path):
+        return assets.response(path, request) or ("not found", 404)
+
+    return app.test_client()
+
+
+def test_hashed_bundles_are_immutable_and_other_files_revalidated(client):
+    assert client.get(f"/{BUNDLE}").headers["Cache-Control"] == IMMUTABLE
+    assert client.get("/index.html").headers["Cache-Control"] == REVALIDATE
+
+
+def test_unchanged_file_is_answered_with_304(client):
+    etag = client.get("/index.html").headers["ETag"]
+    response = client.get("/index.html", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_preferred_encoding_is_sent(client):
+    response = client.get(f"/{BUNDLE}", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.data == b"brotli bytes"
+
+    response = client.get(f"/{BUNDLE}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == b"console.log('app');" * 50
+    assert response.headers["Content-Type"].startswith("text/javascript")
+    assert response.headers["Content-Disposition"] == "inline; filename=index-4f3a2b1c.js"
+
+
+def test_identity_without_accept_encoding(client):
+    response = client.get(f"/{BUNDLE}")
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"console.log('app');" * 50
+
+
+def test_vary_is_set_only_for_files_with_variants(client):
+    assert "Accept-Encoding" in client.get(f"/{BUNDLE}").headers["Vary"]
+    assert "Vary" not in client.get("/index.html").headers
+
+
+def test_etag_differs_per_encoding(client):
+    gzip_etag = client.get(f"/{BUNDLE}", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    identity_etag = client.get(f"/{BUNDLE}").headers["ETag"]
+    assert gzip_etag != identity_etag
+    response = client.get(f"/{BUNDLE}", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+    assert "Content-Encoding" not in response.headers
+
+
+def test_unknown_path(client):
+    assert client.get("/missing.js").status_code == 404
@@ -0,0 +1,45 @@
+import threading
+import time
+
+import constants
+from model_service import count_tokens
+
+_lock = threading.Lock()
+_state = {"imports": False, "tokenizer": False, "seconds": None}
+
+
+def warm_up() -> None:
+    """
+    Loads the modules that model_service.py and project_analyzer.py import lazily and the
+    tiktoken encodings count_tokens uses for the routed models.
+
+    Called by gunicorn in the master process (see gunicorn.conf.py), so that with preload
+    the workers inherit everything copy-on-write instead of each loading it on its first
+    request. Must not create threads or network clients, which do not survive a fork.
+    Failures are logged rather than raised, so they cannot stop the server from starting.
+    """
+    with _lock:
+        if is_warm():
+            return
+        start = time.perf_counter()
+        try:
+            import openai  # noqa: F401
+            import nbformat  # noqa: F401
+            from langchain_community.chat_models import ChatOpenAI  # noqa: F401
+            _state["imports"] = True
+            for model in {constants.DEFAULT_MODEL, *constants.MODEL_ROUTES.values()}:
+                count_tokens("warm up", model)
+            _state["tokenizer"] = True
+        except Exception as e:
+            print(f"Warm up failed: {e}")
+            return
+        _state["seconds"] = round(time.perf_counter() - start, 3)
+        print(f"Warmed up in {_state['seconds']}s")
+
+
+def is_warm() -> bool:
+    return _state["imports"] and _state["tokenizer"]
+
+
+def status() -> dict:
+    return {"warm": is_warm(), **_state}